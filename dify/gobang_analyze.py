@@ -0,0 +1,218 @@
+import argparse
+import os
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+try:
+    from .gomoku import BOARD_SIZE, BitBoard
+    from .gomoku.book import open_book, write_book
+    from .gomoku.board import SYMMETRIES
+    from .gomoku.records import RESULT_DRAW, RESULT_UNFINISHED, iter_games
+    from .gomoku.threats import ThreatSearch
+except ImportError:
+    from gomoku import BOARD_SIZE, BitBoard
+    from gomoku.book import open_book, write_book
+    from gomoku.board import SYMMETRIES
+    from gomoku.records import RESULT_DRAW, RESULT_UNFINISHED, iter_games
+    from gomoku.threats import ThreatSearch
+
+BLUNDER_KINDS = ("missed_win", "missed_block", "missed_vcf")
+BLUNDER_EXAMPLES = 10  # 每类失误最多列出的例子数
+VCF_NODE_LIMIT = 2000
+
+
+def iter_logs(paths, limit=None):
+    # 依次流式读取多个对局日志
+    count = 0
+    for path in paths:
+        for record in iter_games(path):
+            if limit is not None and count >= limit:
+                return
+            count += 1
+            yield record
+
+
+def stream_map(pool, fn, tasks, batch_size):
+    # Executor.map 会一次提交所有任务，这里分批提交，内存中最多只有一批记录
+    tasks = iter(tasks)
+    while True:
+        batch = list(islice(tasks, batch_size))
+        if not batch:
+            return
+        yield from pool.map(fn, batch, chunksize=64)
+
+
+def run_stats(args):
+    results = Counter()
+    matchups = defaultdict(Counter)
+    lengths = Counter()
+    first_moves = Counter()
+    for record in iter_logs(args.logs, args.limit):
+        results[record.result] += 1
+        matchups[(record.black, record.white)][record.result] += 1
+        lengths[len(record.moves)] += 1
+        if record.moves:
+            first_moves[divmod(record.moves[0], BOARD_SIZE)] += 1
+
+    total = sum(results.values())
+    if not total:
+        print("没有对局记录")
+        return
+    print(f"对局数: {total}")
+    print(f"黑胜 {results[1]}  白胜 {results[2]}  和棋 {results[RESULT_DRAW]}  未下完 {results[RESULT_UNFINISHED]}")
+
+    # 只按不同的手数累加局数找中位数，不展开成每局一项，内存与对局数无关
+    seen = 0
+    for length in sorted(lengths):
+        seen += lengths[length]
+        if seen > total // 2:
+            median = length
+            break
+    average = sum(length * n for length, n in lengths.items()) / total
+    print(f"手数: 平均 {average:.1f}  中位数 {median}  最短 {min(lengths)}  最长 {max(lengths)}")
+
+    print()
+    print(f"{'黑方':<10}{'白方':<10}{'局数':>8}{'黑胜':>8}{'白胜':>8}{'和棋':>8}")
+    for (black, white), counter in sorted(matchups.items()):
+        print(f"{black:<10}{white:<10}{sum(counter.values()):>8}{counter[1]:>8}{counter[2]:>8}{counter[RESULT_DRAW]:>8}")
+
+    print()
+    print("最常见的第一手: " + ", ".join(f"{move} x{n}" for move, n in first_moves.most_common(5)))
+
+
+def run_book(args):
+    """从对局结果中挖掘开局库: 同一规范局面下按走子方的得分率选着法"""
+    # stats[规范哈希][规范坐标下的着法] = [局数, 走子方得分]
+    stats = defaultdict(lambda: defaultdict(lambda: [0, 0.0]))
+    for record in iter_logs(args.logs, args.limit):
+        if record.result == RESULT_UNFINISHED:
+            continue
+        board = BitBoard()
+        for ply, idx in enumerate(record.moves[:args.plies]):
+            player = 1 if ply % 2 == 0 else 2
+            key, sym = board.canonical_hash()
+            entry = stats[key][SYMMETRIES[sym][idx]]
+            entry[0] += 1
+            entry[1] += 0.5 if record.result == RESULT_DRAW else float(record.result == player)
+            board.place(*divmod(idx, BOARD_SIZE), player)
+
+    entries = {}
+    max_stones = args.plies - 1
+    if args.merge:
+        book = open_book(args.output)
+        if book is not None:
+            entries = {key: (move, weight) for key, move, weight in book.entries()}
+            max_stones = max(max_stones, book.max_stones)
+            book.close()
+    mined = 0
+    for key, moves in stats.items():
+        candidates = [(score / games, games, move) for move, (games, score) in moves.items() if games >= args.min_games]
+        if not candidates:
+            continue
+        _, games, move = max(candidates)
+        entries[key] = (move, min(games, 0xFFFF))
+        mined += 1
+    write_book(args.output, entries, max_stones)
+    print(f"统计了 {len(stats)} 个开局局面，其中 {mined} 个写入开局库 {args.output}(共 {len(entries)} 个局面)")
+
+
+def find_blunders(task):
+    """
+    在工作进程中重放一局，返回 (各类型走子方的着法数, 失误列表)
+    失误: 能直接成五却没走(missed_win)；对方有唯一的成五点却没挡(missed_block)；
+    有 VCF 却走了一步既不是 VCF 起手、也不冲四的棋(missed_vcf，需要 check_vcf)
+    """
+    game_index, moves, black, white, check_vcf = task
+    board = BitBoard()
+    counts = Counter()
+    blunders = []
+    for ply, idx in enumerate(moves):
+        player = 1 if ply % 2 == 0 else 2
+        mover = black if player == 1 else white
+        counts[mover] += 1
+        wins = board.five_cells[player]
+        threats = board.five_cells[3 - player]
+        kind = expected = None
+        if wins:
+            if idx not in wins:
+                kind, expected = "missed_win", min(wins)
+        elif len(threats) == 1:
+            if idx not in threats:
+                kind, expected = "missed_block", next(iter(threats))
+        elif check_vcf and not threats:
+            line = ThreatSearch(board, node_limit=VCF_NODE_LIMIT).vcf(player)
+            if line and idx != line[0]:
+                board.place(*divmod(idx, BOARD_SIZE), player)
+                if not board.five_cells[player]:
+                    kind, expected = "missed_vcf", line[0]
+                board.remove(*divmod(idx, BOARD_SIZE))
+        if kind is not None:
+            blunders.append((kind, mover, game_index, ply, divmod(idx, BOARD_SIZE), divmod(expected, BOARD_SIZE)))
+        board.place(*divmod(idx, BOARD_SIZE), player)
+    return counts, blunders
+
+
+def run_blunders(args):
+    tasks = ((i, bytes(record.moves), record.black, record.white, args.vcf)
+             for i, record in enumerate(iter_logs(args.logs, args.limit)))
+    moves = Counter()
+    totals = defaultdict(Counter)
+    examples = defaultdict(list)
+    workers = args.workers or os.cpu_count() or 1
+    games = 0
+    with ProcessPoolExecutor(workers) as pool:
+        for counts, blunders in stream_map(pool, find_blunders, tasks, workers * 64 * 8):
+            games += 1
+            moves.update(counts)
+            for kind, mover, *detail in blunders:
+                totals[mover][kind] += 1
+                if len(examples[kind]) < BLUNDER_EXAMPLES:
+                    examples[kind].append((mover, *detail))
+            if games % 10000 == 0:
+                print(f"  已分析 {games} 局", file=sys.stderr)
+
+    print(f"对局数: {games}")
+    print(f"{'走子方':<10}{'着法数':>10}" + "".join(f"{kind:>14}" for kind in BLUNDER_KINDS) + f"{'每千步失误':>12}")
+    for mover, count in sorted(moves.items()):
+        row = totals[mover]
+        rate = sum(row.values()) * 1000 / count
+        print(f"{mover:<10}{count:>10}" + "".join(f"{row[kind]:>14}" for kind in BLUNDER_KINDS) + f"{rate:>12.2f}")
+    for kind in BLUNDER_KINDS:
+        if examples[kind]:
+            print()
+            print(f"{kind} 示例 (走子方, 对局序号, 第几手, 实际着法, 应走):")
+            for example in examples[kind]:
+                print("  ", *example)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量分析对局日志: 统计、挖掘开局库、查找失误")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stats = subparsers.add_parser("stats", help="对局结果和手数统计")
+    stats.set_defaults(func=run_stats)
+
+    book = subparsers.add_parser("book", help="从对局结果挖掘开局库")
+    book.add_argument("--plies", type=int, default=8, help="统计的开局手数")
+    book.add_argument("--min-games", type=int, default=5, help="着法至少出现的局数")
+    book.add_argument("--output", required=True, help="开局库文件")
+    book.add_argument("--merge", action="store_true", help="保留已有开局库中没有被挖掘到的局面")
+    book.set_defaults(func=run_book)
+
+    blunders = subparsers.add_parser("blunders", help="重放对局，查找漏掉的取胜和防守")
+    blunders.add_argument("--vcf", action="store_true", help="同时查找漏掉的 VCF(较慢)")
+    blunders.add_argument("--workers", type=int, help="并行分析的进程数，默认 CPU 核数")
+    blunders.set_defaults(func=run_blunders)
+
+    for subparser in (stats, book, blunders):
+        subparser.add_argument("logs", nargs="+", help="对局日志文件")
+        subparser.add_argument("--limit", type=int, help="最多分析的对局数")
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import os
+import time
+
+try:
+    from .gomoku import GameState, MinimaxSearch, TranspositionTable
+    from .gomoku.board import clear_shape_caches
+    from .gomoku.parallel import ParallelSearch
+    from .gomoku.stats import SearchStats
+except ImportError:
+    from gomoku import GameState, MinimaxSearch, TranspositionTable
+    from gomoku.board import clear_shape_caches
+    from gomoku.parallel import ParallelSearch
+    from gomoku.stats import SearchStats
+
+# 固定的测试局面(黑先交替落子)，都轮到白方(AI)走
+BENCH_POSITIONS = [
+    [(7, 7), (7, 8), (8, 8), (6, 6), (9, 9)],
+    [(7, 7), (6, 8), (8, 7), (6, 7), (6, 6), (9, 8), (8, 9)],
+    [(7, 7), (8, 8), (7, 9), (7, 8), (6, 8), (9, 8), (5, 9), (8, 6), (6, 10)],
+    [(7, 7), (7, 6), (8, 6), (6, 8), (9, 5), (10, 4), (8, 8), (8, 7), (7, 9), (6, 10), (9, 7)],
+]
+
+
+def to_history(moves):
+    return [(r, c, 1 if i % 2 == 0 else 2) for i, (r, c) in enumerate(moves)]
+
+
+def search_serial(history, depth):
+    state = GameState.from_history(history)
+    search = MinimaxSearch(state.bitboard, TranspositionTable(64), state.current_player, time_limit=None,
+                           max_depth=depth)
+    search.run()
+    return search
+
+
+def bench_serial(histories, depth, profile=None):
+    """串行搜索所有局面，返回 (耗时, 节点数, 汇总的 SearchStats)；profile 为文件路径时用 cProfile 记录"""
+    # 与并行模式相同: 从冷的棋形缓存开始，先不计时地搜一个浅层局面
+    clear_shape_caches()
+    search_serial(histories[0], 1)
+    stats = SearchStats("hard", 2)
+    profiler = None
+    if profile is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start = time.perf_counter()
+    for history in histories:
+        stats.add_search(search_serial(history, depth))
+    elapsed = time.perf_counter() - start
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(profile)
+    return elapsed, stats.nodes, stats
+
+
+def bench_parallel(histories, depth, workers):
+    # 工作进程 fork 时会继承主进程的棋形缓存，先清空，与串行模式一样从冷缓存开始
+    clear_shape_caches()
+    search = ParallelSearch(workers)
+    try:
+        # 先搜一个浅层局面，把进程启动时间排除在计时之外
+        search.search(histories[0], 2, time_limit=None, depth=1)
+        nodes = 0
+        start = time.perf_counter()
+        for history in histories:
+            search.search(history, 2, time_limit=None, depth=depth)
+            nodes += search.nodes
+        return time.perf_counter() - start, nodes
+    finally:
+        search.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="五子棋根节点并行搜索的加速比基准测试")
+    parser.add_argument("--depth", type=int, default=3, help="每个局面的固定搜索深度")
+    parser.add_argument("--workers", type=int, nargs="*", help="要测试的进程数，默认 1,2,4... 直到 CPU 核数")
+    parser.add_argument("--profile", help="把串行搜索的 cProfile 结果写入该文件(计时会变慢)")
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({min(1 << i, cpu_count) for i in range(cpu_count.bit_length() + 1)})
+    histories = [to_history(moves) for moves in BENCH_POSITIONS]
+
+    serial_time, serial_nodes, stats = bench_serial(histories, args.depth, args.profile)
+    print(f"局面数: {len(histories)}  深度: {args.depth}  CPU 核数: {cpu_count}")
+    summary = stats.as_dict()
+    print(f"叶子评估: {summary['leaf_evals']}  置换表命中率: {summary['tt_hit_rate']:.1%}  "
+          f"有效分支因子: {summary['branching_factor']}  各层剪枝: {summary['cutoffs']}")
+    print(f"{'模式':<10}{'耗时(秒)':>10}{'节点数':>12}{'节点/秒':>12}{'加速比':>8}")
+    print(f"{'串行':<10}{serial_time:>10.2f}{serial_nodes:>12}{serial_nodes / serial_time:>12.0f}{1.0:>8.2f}")
+    for workers in worker_counts:
+        elapsed, nodes = bench_parallel(histories, args.depth, workers)
+        label = f"{workers} 进程"
+        print(f"{label:<10}{elapsed:>10.2f}{nodes:>12}{nodes / elapsed:>12.0f}{serial_time / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
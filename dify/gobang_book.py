@@ -0,0 +1,92 @@
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .gomoku import AI, BOARD_SIZE, GameState
+    from .gomoku.book import BOOK_FILE, book_entry, open_book, write_book
+except ImportError:
+    from gomoku import AI, BOARD_SIZE, GameState
+    from gomoku.book import BOOK_FILE, book_entry, open_book, write_book
+
+
+def sample_openings(games, plies, spread, seed):
+    """
+    用带随机性的自我对弈收集开局局面: 每步在攻防分最高的 spread 个点中随机选一个
+    按规范哈希去重，对称的局面只保留一个，返回各局面的着法记录
+    """
+    rng = random.Random(seed)
+    seen = set()
+    openings = []
+    for _ in range(games):
+        state = GameState()
+        state.sound_on = False
+        while len(state.move_history) < plies and not state.game_over:
+            board = state.bitboard
+            key = board.canonical_hash()[0]
+            if key not in seen:
+                seen.add(key)
+                openings.append([(r, c) for r, c, _ in state.move_history])
+            player = state.current_player
+            ranked = sorted(board.candidate_moves(), key=lambda idx: board.move_priority(idx, player), reverse=True)
+            state.make_move(*divmod(rng.choice(ranked[:spread]), BOARD_SIZE))
+    return openings
+
+
+def analyse_position(task):
+    """在工作进程中用困难难度(不查开局库)搜索一个局面，返回 (规范哈希, 规范坐标下的着法, 搜索深度)"""
+    moves, time_limit = task
+    state = GameState()
+    state.sound_on = False
+    for row, col in moves:
+        state.make_move(row, col)
+    ai = AI("hard", tt_mb=16, time_limit=time_limit, book=None)
+    row, col = ai.make_move(state)
+    ai.close()
+    key, move = book_entry(state.bitboard, row * BOARD_SIZE + col)
+    return key, move, max(ai.last_depth, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线生成五子棋开局库")
+    parser.add_argument("--games", type=int, default=200, help="收集开局局面的自我对弈局数")
+    parser.add_argument("--plies", type=int, default=8, help="收录的开局手数")
+    parser.add_argument("--spread", type=int, default=3, help="自我对弈时每步随机选择的候选数")
+    parser.add_argument("--time", type=float, default=2.0, help="每个局面的搜索时间(秒)")
+    parser.add_argument("--workers", type=int, help="并行搜索的进程数，默认 CPU 核数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=BOOK_FILE, help="开局库文件")
+    parser.add_argument("--merge", action="store_true", help="保留已有开局库中的局面，同一局面取搜索更深的结果")
+    args = parser.parse_args()
+
+    openings = sample_openings(args.games, args.plies, args.spread, args.seed)
+    workers = args.workers or os.cpu_count() or 1
+    print(f"局面数: {len(openings)}  进程数: {workers}  每个局面 {args.time} 秒")
+
+    entries = {}
+    max_stones = args.plies - 1
+    if args.merge:
+        book = open_book(args.output)
+        if book is not None:
+            entries = {key: (move, weight) for key, move, weight in book.entries()}
+            max_stones = max(max_stones, book.max_stones)
+            book.close()
+
+    start = time.perf_counter()
+    tasks = [(moves, args.time) for moves in openings]
+    with ProcessPoolExecutor(workers) as pool:
+        for done, (key, move, depth) in enumerate(pool.map(analyse_position, tasks), 1):
+            if key not in entries or depth >= entries[key][1]:
+                entries[key] = (move, depth)
+            if done % 20 == 0:
+                print(f"  已完成 {done}/{len(tasks)}", file=sys.stderr)
+
+    write_book(args.output, entries, max_stones)
+    print(f"写入 {len(entries)} 个局面到 {args.output}，用时 {time.perf_counter() - start:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,16 @@
 import pygame
+import os
 import sys
-import random
-import time
 from pygame.locals import *
 
-# 初始化
-pygame.init()
-pygame.mixer.init()
+try:
+    from .gomoku import BOARD_SIZE, AI, AIWorker, GameState
+    from .gomoku.records import append_game, encode_game, game_result
+except ImportError:
+    from gomoku import BOARD_SIZE, AI, AIWorker, GameState
+    from gomoku.records import append_game, encode_game, game_result
 
 # 常量定义
-BOARD_SIZE = 15
 GRID_SIZE = 40
 PIECE_RADIUS = 18
 MARGIN = 40
@@ -26,540 +27,264 @@ HIGHLIGHT_COLOR = (255, 0, 0)
 TEXT_COLOR = (50, 50, 50)
 PANEL_COLOR = (240, 240, 240)
 
-# 创建游戏窗口
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption('Gomoku')
-clock = pygame.time.Clock()
+# 下完的对局追加保存到这个日志，可以用 gobang_analyze.py 批量分析
+GAME_LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gobang_games.log")
 
-# 加载音效
-try:
-    place_sound = pygame.mixer.Sound("place.wav")
-    win_sound = pygame.mixer.Sound("win.wav")
-except:
-    print("音效文件未找到，游戏将继续但没有音效")
-    place_sound = None
-    win_sound = None
-
-
-# 游戏状态
-class GameState:
-    def __init__(self):
-        self.board = [[0 for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
-        self.current_player = 1  # 1 for black, 2 for white
-        self.game_over = False
-        self.winner = 0
-        self.winning_line = []
-        self.mode = "menu"  # menu, pvp, pve
-        self.ai_difficulty = "medium"  # easy, medium, hard
-        self.sound_on = True
-        self.move_history = []
-        self.last_move = None
-
-    def reset(self):
-        self.board = [[0 for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
-        self.current_player = 1
-        self.game_over = False
-        self.winner = 0
-        self.winning_line = []
-        self.move_history = []
-        self.last_move = None
-
-    def make_move(self, row, col):
-        if self.game_over or self.board[row][col] != 0:
-            return False
+# 窗口、时钟和音效在 main() 中调用 init_display() 后才创建，导入本模块不会打开窗口
+screen = None
+clock = None
+place_sound = None
+win_sound = None
 
-        self.board[row][col] = self.current_player
-        self.move_history.append((row, col, self.current_player))
-        self.last_move = (row, col)
 
-        if self.check_win(row, col):
-            self.game_over = True
-            self.winner = self.current_player
-            if self.sound_on and win_sound:
-                win_sound.play()
-        elif self.is_board_full():
-            self.game_over = True
+def init_display():
+    global screen, clock, place_sound, win_sound
+    pygame.init()
+    pygame.mixer.init()
 
-        self.current_player = 3 - self.current_player  # Switch player (1->2, 2->1)
+    # 创建游戏窗口
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption('Gomoku')
+    clock = pygame.time.Clock()
 
-        if self.sound_on and place_sound:
-            place_sound.play()
+    # 加载音效
+    try:
+        place_sound = pygame.mixer.Sound("place.wav")
+        win_sound = pygame.mixer.Sound("win.wav")
+    except:
+        print("音效文件未找到，游戏将继续但没有音效")
+        place_sound = None
+        win_sound = None
 
-        return True
 
-    def undo_move(self):
-        if len(self.move_history) == 0:
+def play_move(game_state, row, col):
+    # 落子并按设置播放音效，引擎本身不涉及声音
+    if not game_state.make_move(row, col):
+        return False
+    if game_state.sound_on:
+        if game_state.winner and win_sound:
+            win_sound.play()
+        if place_sound:
+            place_sound.play()
+    return True
+
+
+def save_game(game_state):
+    # 保存失败(例如目录只读)不影响游戏
+    white = game_state.ai_difficulty if game_state.mode == "pve" else "human"
+    try:
+        append_game(GAME_LOG_FILE, encode_game(game_state.move_history, game_result(game_state), "human", white))
+    except OSError:
+        print("对局记录保存失败")
+
+
+# 绘制
+BUTTON_COLOR = (200, 200, 200)
+SELECTED_COLOR = (150, 200, 150)
+STATUS_RECT = pygame.Rect(0, HEIGHT - 60, WIDTH - 290, 60)  # 状态文字区域，右侧是按钮
+
+
+def cell_center(row, col):
+    return MARGIN + col * GRID_SIZE, MARGIN + row * GRID_SIZE
+
+
+def cell_rect(row, col):
+    # 棋子半径小于半个格距，每个棋子连同标记都在以交叉点为中心的一格之内
+    x, y = cell_center(row, col)
+    return pygame.Rect(x - GRID_SIZE // 2, y - GRID_SIZE // 2, GRID_SIZE, GRID_SIZE)
+
+
+class Renderer:
+    """
+    带缓存的绘制: 字体和文字只渲染一次，棋盘底图(网格、面板、按钮)、菜单页和设置页预先画好
+    局面没有变化时整帧跳过；只是多走了几步时只重画变化的格子和状态栏，用 display.update(矩形) 提交
+    """
+
+    def __init__(self, surface):
+        self.screen = surface
+        self.fonts = {}
+        self.texts = {}
+        self.pages = {}  # 菜单页和设置页的整页缓存
+        self.background = self.render_background()
+        self.shown = None  # 当前屏幕上画的内容，与它相同时跳过本帧
+        self.drawn_moves = None  # 棋盘上已经画出的着法，None 表示需要整屏重画
+        self.drawn_marker = None
+
+    def invalidate(self):
+        # 窗口被遮挡后重新显示等情况下调用，下一帧整屏重画
+        self.shown = None
+        self.drawn_moves = None
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.SysFont('Arial', size)
+        return font
+
+    def text(self, text, size):
+        key = (text, size)
+        surface = self.texts.get(key)
+        if surface is None:
+            surface = self.texts[key] = self.font(size).render(text, True, TEXT_COLOR)
+        return surface
+
+    def button(self, surface, rect, label, size, color=BUTTON_COLOR, label_pos=None):
+        pygame.draw.rect(surface, color, rect)
+        text = self.text(label, size)
+        if label_pos is None:
+            label_pos = (rect[0] + rect[2] // 2 - text.get_width() // 2, rect[1] + 10)
+        surface.blit(text, label_pos)
+
+    def render_background(self):
+        # 棋盘背景、网格、底部面板和按钮，不随局面变化
+        surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+        surface.fill(BOARD_COLOR)
+        for i in range(BOARD_SIZE):
+            # 横线
+            pygame.draw.line(surface, LINE_COLOR,
+                             (MARGIN, MARGIN + i * GRID_SIZE),
+                             (WIDTH - MARGIN, MARGIN + i * GRID_SIZE), 2)
+            # 竖线
+            pygame.draw.line(surface, LINE_COLOR,
+                             (MARGIN + i * GRID_SIZE, MARGIN),
+                             (MARGIN + i * GRID_SIZE, HEIGHT - MARGIN - 60), 2)
+
+        pygame.draw.rect(surface, PANEL_COLOR, (0, HEIGHT - 60, WIDTH, 60))
+        # 悔棋、重新开始、菜单按钮
+        self.button(surface, (WIDTH - 280, HEIGHT - 50, 80, 30), "Undo", 18, label_pos=(WIDTH - 260, HEIGHT - 45))
+        self.button(surface, (WIDTH - 180, HEIGHT - 50, 100, 30), "Restart", 18, label_pos=(WIDTH - 165, HEIGHT - 45))
+        self.button(surface, (WIDTH - 70, HEIGHT - 50, 60, 30), "Menu", 18, label_pos=(WIDTH - 55, HEIGHT - 45))
+        return surface
+
+    def render_menu(self):
+        surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+        surface.fill(PANEL_COLOR)
+        title_text = self.text("GOMOKU", 48)
+        surface.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, 50))
+        for top, label in ((150, "Player vs Player"), (220, "Player vs Computer"), (290, "Settings"), (360, "Quit")):
+            self.button(surface, (WIDTH // 2 - 150, top, 300, 50), label, 32)
+        return surface
+
+    def render_settings(self, difficulty, sound_on):
+        surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+        surface.fill(PANEL_COLOR)
+        title_text = self.text("SETTINGS", 48)
+        surface.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, 50))
+
+        # AI难度设置
+        surface.blit(self.text("AI Difficulty:", 24), (50, 120))
+        for left, label_x, level, label in ((50, 75, "easy", "Easy"), (170, 180, "medium", "Medium"),
+                                            (290, 310, "hard", "Hard"), (410, 430, "mcts", "MCTS")):
+            color = SELECTED_COLOR if difficulty == level else BUTTON_COLOR
+            self.button(surface, (left, 160, 100, 40), label, 20, color, (label_x, 170))
+
+        # 音效设置
+        surface.blit(self.text("Sound:", 24), (50, 220))
+        self.button(surface, (50, 260, 100, 40), "On", 20, SELECTED_COLOR if sound_on else BUTTON_COLOR, (80, 270))
+        self.button(surface, (170, 260, 100, 40), "Off", 20, BUTTON_COLOR if sound_on else SELECTED_COLOR, (200, 270))
+
+        # 返回按钮
+        self.button(surface, (WIDTH // 2 - 100, HEIGHT - 100, 200, 50), "Back to Menu", 24)
+        return surface
+
+    def draw(self, game_state):
+        """画当前界面，返回本帧是否有更新"""
+        if game_state.mode == "menu":
+            key = ("menu",)
+        elif game_state.mode == "settings":
+            key = ("settings", game_state.ai_difficulty, game_state.sound_on)
+        else:
+            key = ("board", tuple(game_state.move_history), game_state.game_over, game_state.current_player)
+        if key == self.shown:
             return False
 
-        row, col, player = self.move_history.pop()
-        self.board[row][col] = 0
-        self.current_player = player
-        self.game_over = False
-        self.winner = 0
-        self.winning_line = []
-
-        if len(self.move_history) > 0:
-            self.last_move = (self.move_history[-1][0], self.move_history[-1][1])
+        if key[0] == "board":
+            self.draw_board(game_state)
         else:
-            self.last_move = None
-
-        return True
-
-    def check_win(self, row, col):
-        directions = [(1, 0), (0, 1), (1, 1), (1, -1)]  # 水平, 垂直, 对角线, 反对角线
-        player = self.board[row][col]
-
-        for dr, dc in directions:
-            count = 1
-            line = [(row, col)]
-
-            # 正向检查
-            r, c = row + dr, col + dc
-            while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE and self.board[r][c] == player:
-                count += 1
-                line.append((r, c))
-                r += dr
-                c += dc
-
-            # 反向检查
-            r, c = row - dr, col - dc
-            while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE and self.board[r][c] == player:
-                count += 1
-                line.append((r, c))
-                r -= dr
-                c -= dc
-
-            if count >= 5:
-                self.winning_line = line
-                return True
-
-        return False
-
-    def is_board_full(self):
-        for row in range(BOARD_SIZE):
-            for col in range(BOARD_SIZE):
-                if self.board[row][col] == 0:
-                    return False
+            page = self.pages.get(key)
+            if page is None:
+                page = self.pages[key] = self.render_menu() if key[0] == "menu" else self.render_settings(*key[1:])
+            self.screen.blit(page, (0, 0))
+            pygame.display.flip()
+            self.drawn_moves = None
+        self.shown = key
         return True
 
-
-# AI逻辑
-class AI:
-    def __init__(self, difficulty="medium"):
-        self.difficulty = difficulty
-
-    def make_move(self, game_state):
-        if self.difficulty == "easy":
-            return self.easy_ai(game_state)
-        elif self.difficulty == "medium":
-            return self.medium_ai(game_state)
+    def draw_stone(self, row, col, player):
+        # 先用底图盖住这一格(擦掉旧标记)，再画棋子
+        rect = cell_rect(row, col)
+        self.screen.blit(self.background, rect, rect)
+        center = cell_center(row, col)
+        if player == 1:  # 黑子
+            pygame.draw.circle(self.screen, BLACK, center, PIECE_RADIUS)
+        elif player == 2:  # 白子
+            pygame.draw.circle(self.screen, WHITE, center, PIECE_RADIUS)
+            pygame.draw.circle(self.screen, LINE_COLOR, center, PIECE_RADIUS, 1)
+        return rect
+
+    def draw_board(self, game_state):
+        history = game_state.move_history
+        drawn = self.drawn_moves
+        dirty = []
+        if drawn is None or len(drawn) > len(history) or history[:len(drawn)] != drawn:
+            # 悔棋、重新开始或刚从其他界面切换过来，整屏重画
+            self.screen.blit(self.background, (0, 0))
+            for row, col, player in history:
+                self.draw_stone(row, col, player)
+            dirty = None
         else:
-            return self.hard_ai(game_state)
-
-    def easy_ai(self, game_state):
-        # 随机落子，但会阻止玩家即将获胜的情况
-        empty_cells = [(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE) if game_state.board[r][c] == 0]
-
-        # 检查是否有立即获胜的机会
-        for r, c in empty_cells:
-            game_state.board[r][c] = 2
-            if game_state.check_win(r, c):
-                game_state.board[r][c] = 0
-                return r, c
-            game_state.board[r][c] = 0
-
-        # 检查是否需要阻止玩家
-        for r, c in empty_cells:
-            game_state.board[r][c] = 1
-            if game_state.check_win(r, c):
-                game_state.board[r][c] = 0
-                return r, c
-            game_state.board[r][c] = 0
-
-        # 随机选择
-        return random.choice(empty_cells)
-
-    def medium_ai(self, game_state):
-        # 简单的评估函数
-        def evaluate_position(r, c, player):
-            directions = [(1, 0), (0, 1), (1, 1), (1, -1)]
-            score = 0
-
-            for dr, dc in directions:
-                # 四个方向
-                line = 1
-
-                # 正向
-                i, j = r + dr, c + dc
-                while 0 <= i < BOARD_SIZE and 0 <= j < BOARD_SIZE and game_state.board[i][j] == player:
-                    line += 1
-                    i += dr
-                    j += dc
-
-                # 反向
-                i, j = r - dr, c - dc
-                while 0 <= i < BOARD_SIZE and 0 <= j < BOARD_SIZE and game_state.board[i][j] == player:
-                    line += 1
-                    i -= dr
-                    j -= dc
-
-                if line >= 5:
-                    return 100000  # 获胜
-
-                # 根据连子数给分
-                if line == 4:
-                    score += 1000
-                elif line == 3:
-                    score += 100
-                elif line == 2:
-                    score += 10
-                elif line == 1:
-                    score += 1
-
-            return score
-
-        empty_cells = [(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE) if game_state.board[r][c] == 0]
-
-        # 检查是否有立即获胜的机会
-        for r, c in empty_cells:
-            game_state.board[r][c] = 2
-            if game_state.check_win(r, c):
-                game_state.board[r][c] = 0
-                return r, c
-            game_state.board[r][c] = 0
-
-        # 检查是否需要阻止玩家
-        for r, c in empty_cells:
-            game_state.board[r][c] = 1
-            if game_state.check_win(r, c):
-                game_state.board[r][c] = 0
-                return r, c
-            game_state.board[r][c] = 0
-
-        # 评估每个空位
-        best_score = -1
-        best_move = None
-
-        for r, c in empty_cells:
-            # 进攻得分
-            attack_score = evaluate_position(r, c, 2)
-            # 防守得分
-            defense_score = evaluate_position(r, c, 1)
-            total_score = attack_score + defense_score * 0.8  # 稍微偏重防守
-
-            if total_score > best_score:
-                best_score = total_score
-                best_move = (r, c)
-
-        return best_move
-
-    def hard_ai(self, game_state):
-        # 使用极小化极大算法和alpha-beta剪枝
-        def minimax(board, depth, alpha, beta, is_maximizing):
-            # 评估函数
-            def evaluate():
-                score = 0
-
-                # 检查所有可能的五子连线
-                for r in range(BOARD_SIZE):
-                    for c in range(BOARD_SIZE):
-                        if board[r][c] == 0:
-                            continue
-
-                        # 四个方向
-                        directions = [(1, 0), (0, 1), (1, 1), (1, -1)]
-
-                        for dr, dc in directions:
-                            line = 1
-                            player = board[r][c]
-
-                            # 正向
-                            i, j = r + dr, c + dc
-                            while 0 <= i < BOARD_SIZE and 0 <= j < BOARD_SIZE and board[i][j] == player:
-                                line += 1
-                                i += dr
-                                j += dc
-
-                            # 反向
-                            i, j = r - dr, c - dc
-                            while 0 <= i < BOARD_SIZE and 0 <= j < BOARD_SIZE and board[i][j] == player:
-                                line += 1
-                                i -= dr
-                                j -= dc
-
-                            if line >= 5:
-                                if player == 2:  # AI获胜
-                                    return 100000
-                                else:  # 玩家获胜
-                                    return -100000
-
-                            # 根据连子数给分
-                            if player == 2:  # AI
-                                if line == 4:
-                                    score += 1000
-                                elif line == 3:
-                                    score += 100
-                                elif line == 2:
-                                    score += 10
-                            else:  # 玩家
-                                if line == 4:
-                                    score -= 1200  # 更重视防守
-                                elif line == 3:
-                                    score -= 120
-                                elif line == 2:
-                                    score -= 12
-
-                return score
-
-            # 终止条件
-            if depth == 0:
-                return evaluate()
-
-            # 检查游戏是否结束
-            game_over = True
-            for r in range(BOARD_SIZE):
-                for c in range(BOARD_SIZE):
-                    if board[r][c] == 0:
-                        game_over = False
-                        break
-                if not game_over:
-                    break
-
-            if game_over:
-                return evaluate()
-
-            if is_maximizing:
-                max_eval = -float('inf')
-                for r in range(BOARD_SIZE):
-                    for c in range(BOARD_SIZE):
-                        if board[r][c] == 0:
-                            board[r][c] = 2
-                            eval = minimax(board, depth - 1, alpha, beta, False)
-                            board[r][c] = 0
-                            max_eval = max(max_eval, eval)
-                            alpha = max(alpha, eval)
-                            if beta <= alpha:
-                                return max_eval
-                return max_eval
-            else:
-                min_eval = float('inf')
-                for r in range(BOARD_SIZE):
-                    for c in range(BOARD_SIZE):
-                        if board[r][c] == 0:
-                            board[r][c] = 1
-                            eval = minimax(board, depth - 1, alpha, beta, True)
-                            board[r][c] = 0
-                            min_eval = min(min_eval, eval)
-                            beta = min(beta, eval)
-                            if beta <= alpha:
-                                return min_eval
-                return min_eval
-
-        # 检查是否有立即获胜的机会
-        empty_cells = [(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE) if game_state.board[r][c] == 0]
-
-        for r, c in empty_cells:
-            game_state.board[r][c] = 2
-            if game_state.check_win(r, c):
-                game_state.board[r][c] = 0
-                return r, c
-            game_state.board[r][c] = 0
-
-        # 检查是否需要阻止玩家
-        for r, c in empty_cells:
-            game_state.board[r][c] = 1
-            if game_state.check_win(r, c):
-                game_state.board[r][c] = 0
-                return r, c
-            game_state.board[r][c] = 0
-
-        # 使用极小化极大算法
-        best_score = -float('inf')
-        best_move = None
-
-        # 限制搜索深度以提高性能
-        search_depth = 2 if len(game_state.move_history) < 10 else 3
-
-        for r, c in empty_cells:
-            game_state.board[r][c] = 2
-            score = minimax(game_state.board, search_depth, -float('inf'), float('inf'), False)
-            game_state.board[r][c] = 0
-
-            if score > best_score:
-                best_score = score
-                best_move = (r, c)
-
-        return best_move
-
-
-# 绘制函数
-def draw_board(game_state):
-    # 绘制棋盘背景
-    screen.fill(BOARD_COLOR)
-
-    # 绘制棋盘网格
-    for i in range(BOARD_SIZE):
-        # 横线
-        pygame.draw.line(screen, LINE_COLOR,
-                         (MARGIN, MARGIN + i * GRID_SIZE),
-                         (WIDTH - MARGIN, MARGIN + i * GRID_SIZE), 2)
-        # 竖线
-        pygame.draw.line(screen, LINE_COLOR,
-                         (MARGIN + i * GRID_SIZE, MARGIN),
-                         (MARGIN + i * GRID_SIZE, HEIGHT - MARGIN - 60), 2)
-
-    # 绘制棋子
-    for row in range(BOARD_SIZE):
-        for col in range(BOARD_SIZE):
-            if game_state.board[row][col] == 1:  # 黑子
-                pygame.draw.circle(screen, BLACK,
-                                   (MARGIN + col * GRID_SIZE, MARGIN + row * GRID_SIZE),
-                                   PIECE_RADIUS)
-            elif game_state.board[row][col] == 2:  # 白子
-                pygame.draw.circle(screen, WHITE,
-                                   (MARGIN + col * GRID_SIZE, MARGIN + row * GRID_SIZE),
-                                   PIECE_RADIUS)
-                pygame.draw.circle(screen, LINE_COLOR,
-                                   (MARGIN + col * GRID_SIZE, MARGIN + row * GRID_SIZE),
-                                   PIECE_RADIUS, 1)
-
-    # 标记最后一步
-    if game_state.last_move:
-        row, col = game_state.last_move
-        pygame.draw.circle(screen, (255, 0, 0) if game_state.board[row][col] == 1 else (0, 0, 255),
-                           (MARGIN + col * GRID_SIZE, MARGIN + row * GRID_SIZE), 5)
-
-    # 高亮显示获胜连线
-    if game_state.winning_line:
+            # 只画新增的棋子，并擦掉上一步的标记
+            for row, col, player in history[len(drawn):]:
+                dirty.append(self.draw_stone(row, col, player))
+            if self.drawn_marker is not None and self.drawn_marker != game_state.last_move:
+                row, col = self.drawn_marker
+                dirty.append(self.draw_stone(row, col, game_state.board[row][col]))
+        self.drawn_moves = list(history)
+        self.drawn_marker = game_state.last_move
+
+        # 标记最后一步
+        if game_state.last_move:
+            row, col = game_state.last_move
+            pygame.draw.circle(self.screen, (255, 0, 0) if game_state.board[row][col] == 1 else (0, 0, 255),
+                               cell_center(row, col), 5)
+            if dirty is not None:
+                dirty.append(cell_rect(row, col))
+
+        # 高亮显示获胜连线
         for row, col in game_state.winning_line:
-            pygame.draw.circle(screen, HIGHLIGHT_COLOR,
-                               (MARGIN + col * GRID_SIZE, MARGIN + row * GRID_SIZE),
-                               PIECE_RADIUS // 2)
-
-    # 绘制顶部信息面板
-    pygame.draw.rect(screen, PANEL_COLOR, (0, HEIGHT - 60, WIDTH, 60))
-
-    # 显示当前玩家
-    font = pygame.font.SysFont('Arial', 24)
-    player_text = f"Current: {'Black ●' if game_state.current_player == 1 else 'White ○'}"
-    if game_state.game_over:
-        if game_state.winner == 1:
-            player_text = "Black ● Wins!"
-        elif game_state.winner == 2:
-            player_text = "White ○ Wins!"
-        else:
-            player_text = "Game Over - Draw"
-
-    text_surface = font.render(player_text, True, TEXT_COLOR)
-    screen.blit(text_surface, (20, HEIGHT - 50))
-
-    # 绘制按钮
-    button_font = pygame.font.SysFont('Arial', 18)
-
-    # 悔棋按钮
-    pygame.draw.rect(screen, (200, 200, 200), (WIDTH - 280, HEIGHT - 50, 80, 30))
-    undo_text = button_font.render("Undo", True, TEXT_COLOR)
-    screen.blit(undo_text, (WIDTH - 260, HEIGHT - 45))
-
-    # 重新开始按钮
-    pygame.draw.rect(screen, (200, 200, 200), (WIDTH - 180, HEIGHT - 50, 100, 30))
-    restart_text = button_font.render("Restart", True, TEXT_COLOR)
-    screen.blit(restart_text, (WIDTH - 165, HEIGHT - 45))
-
-    # 菜单按钮
-    pygame.draw.rect(screen, (200, 200, 200), (WIDTH - 70, HEIGHT - 50, 60, 30))
-    menu_text = button_font.render("Menu", True, TEXT_COLOR)
-    screen.blit(menu_text, (WIDTH - 55, HEIGHT - 45))
-
-
-def draw_menu(game_state):
-    screen.fill(PANEL_COLOR)
-
-    title_font = pygame.font.SysFont('Arial', 48)
-    title_text = title_font.render("GOMOKU", True, TEXT_COLOR)
-    screen.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, 50))
-
-    button_font = pygame.font.SysFont('Arial', 32)
-
-    # PvP按钮
-    pygame.draw.rect(screen, (200, 200, 200), (WIDTH // 2 - 150, 150, 300, 50))
-    pvp_text = button_font.render("Player vs Player", True, TEXT_COLOR)
-    screen.blit(pvp_text, (WIDTH // 2 - pvp_text.get_width() // 2, 160))
-
-    # PvE按钮
-    pygame.draw.rect(screen, (200, 200, 200), (WIDTH // 2 - 150, 220, 300, 50))
-    pve_text = button_font.render("Player vs Computer", True, TEXT_COLOR)
-    screen.blit(pve_text, (WIDTH // 2 - pve_text.get_width() // 2, 230))
-
-    # 设置按钮
-    pygame.draw.rect(screen, (200, 200, 200), (WIDTH // 2 - 150, 290, 300, 50))
-    settings_text = button_font.render("Settings", True, TEXT_COLOR)
-    screen.blit(settings_text, (WIDTH // 2 - settings_text.get_width() // 2, 300))
-
-    # 退出按钮
-    pygame.draw.rect(screen, (200, 200, 200), (WIDTH // 2 - 150, 360, 300, 50))
-    quit_text = button_font.render("Quit", True, TEXT_COLOR)
-    screen.blit(quit_text, (WIDTH // 2 - quit_text.get_width() // 2, 370))
-
-
-def draw_settings(game_state):
-    screen.fill(PANEL_COLOR)
-
-    title_font = pygame.font.SysFont('Arial', 48)
-    title_text = title_font.render("SETTINGS", True, TEXT_COLOR)
-    screen.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, 50))
-
-    option_font = pygame.font.SysFont('Arial', 24)
-    button_font = pygame.font.SysFont('Arial', 20)
-
-    # AI难度设置
-    difficulty_text = option_font.render("AI Difficulty:", True, TEXT_COLOR)
-    screen.blit(difficulty_text, (50, 120))
-
-    # 简单难度按钮
-    pygame.draw.rect(screen, (200, 200, 200) if game_state.ai_difficulty != "easy" else (150, 200, 150),
-                     (50, 160, 100, 40))
-    easy_text = button_font.render("Easy", True, TEXT_COLOR)
-    screen.blit(easy_text, (75, 170))
-
-    # 中等难度按钮
-    pygame.draw.rect(screen, (200, 200, 200) if game_state.ai_difficulty != "medium" else (150, 200, 150),
-                     (170, 160, 100, 40))
-    medium_text = button_font.render("Medium", True, TEXT_COLOR)
-    screen.blit(medium_text, (180, 170))
-
-    # 困难难度按钮
-    pygame.draw.rect(screen, (200, 200, 200) if game_state.ai_difficulty != "hard" else (150, 200, 150),
-                     (290, 160, 100, 40))
-    hard_text = button_font.render("Hard", True, TEXT_COLOR)
-    screen.blit(hard_text, (310, 170))
-
-    # 音效设置
-    sound_text = option_font.render("Sound:", True, TEXT_COLOR)
-    screen.blit(sound_text, (50, 220))
-
-    # 开启音效按钮
-    pygame.draw.rect(screen, (200, 200, 200) if not game_state.sound_on else (150, 200, 150),
-                     (50, 260, 100, 40))
-    on_text = button_font.render("On", True, TEXT_COLOR)
-    screen.blit(on_text, (80, 270))
-
-    # 关闭音效按钮
-    pygame.draw.rect(screen, (200, 200, 200) if game_state.sound_on else (150, 200, 150),
-                     (170, 260, 100, 40))
-    off_text = button_font.render("Off", True, TEXT_COLOR)
-    screen.blit(off_text, (200, 270))
+            pygame.draw.circle(self.screen, HIGHLIGHT_COLOR, cell_center(row, col), PIECE_RADIUS // 2)
+            if dirty is not None:
+                dirty.append(cell_rect(row, col))
+
+        # 显示当前玩家
+        player_text = f"Current: {'Black ●' if game_state.current_player == 1 else 'White ○'}"
+        if game_state.game_over:
+            if game_state.winner == 1:
+                player_text = "Black ● Wins!"
+            elif game_state.winner == 2:
+                player_text = "White ○ Wins!"
+            else:
+                player_text = "Game Over - Draw"
+        self.screen.fill(PANEL_COLOR, STATUS_RECT)
+        self.screen.blit(self.text(player_text, 24), (20, HEIGHT - 50))
 
-    # 返回按钮
-    pygame.draw.rect(screen, (200, 200, 200), (WIDTH // 2 - 100, HEIGHT - 100, 200, 50))
-    back_text = option_font.render("Back to Menu", True, TEXT_COLOR)
-    screen.blit(back_text, (WIDTH // 2 - back_text.get_width() // 2, HEIGHT - 90))
+        if dirty is None:
+            pygame.display.flip()
+        else:
+            dirty.append(STATUS_RECT)
+            pygame.display.update(dirty)
 
 
 # 主游戏循环
 def main():
+    init_display()
     game_state = GameState()
-    ai = AI(game_state.ai_difficulty)
+    # AI 在后台线程中思考，主循环只负责提交局面和取回结果
+    worker = AIWorker(AI(game_state.ai_difficulty))
+    worker.start()
+    pending_request = None  # (请求编号, 提交时的着法记录)
+    renderer = Renderer(screen)
+    saved_history = None  # 最近保存的对局，避免同一局重复保存
 
     running = True
     while running:
@@ -567,6 +292,9 @@ def main():
             if event.type == QUIT:
                 running = False
 
+            elif event.type == VIDEOEXPOSE:
+                renderer.invalidate()
+
             elif event.type == MOUSEBUTTONDOWN:
                 x, y = event.pos
 
@@ -592,13 +320,12 @@ def main():
                     if 160 <= y <= 200:  # AI难度
                         if 50 <= x <= 150:  # Easy
                             game_state.ai_difficulty = "easy"
-                            ai.difficulty = "easy"
                         elif 170 <= x <= 270:  # Medium
                             game_state.ai_difficulty = "medium"
-                            ai.difficulty = "medium"
                         elif 290 <= x <= 390:  # Hard
                             game_state.ai_difficulty = "hard"
-                            ai.difficulty = "hard"
+                        elif 410 <= x <= 510:  # MCTS
+                            game_state.ai_difficulty = "mcts"
                     elif 260 <= y <= 300:  # 音效
                         if 50 <= x <= 150:  # On
                             game_state.sound_on = True
@@ -616,7 +343,7 @@ def main():
                         if 0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE:
                             if game_state.mode == "pvp" or (
                                     game_state.mode == "pve" and game_state.current_player == 1):
-                                game_state.make_move(row, col)
+                                play_move(game_state, row, col)
 
                     # 检查按钮点击
                     if HEIGHT - 60 <= y <= HEIGHT - 30:
@@ -627,22 +354,31 @@ def main():
                         elif WIDTH - 70 <= x <= WIDTH - 10:  # Menu
                             game_state.mode = "menu"
 
-                # 在PvE模式下，如果是AI的回合，则让AI走棋
-                if game_state.mode == "pve" and not game_state.game_over and game_state.current_player == 2:
-                    row, col = ai.make_move(game_state)
-                    game_state.make_move(row, col)
-
-        # 绘制当前界面
-        if game_state.mode == "menu":
-            draw_menu(game_state)
-        elif game_state.mode == "settings":
-            draw_settings(game_state)
-        else:
-            draw_board(game_state)
-
-        pygame.display.flip()
+        # 在PvE模式下，如果是AI的回合，则提交给后台线程；悔棋、重新开始等改变局面后作废未完成的请求
+        ai_turn = game_state.mode == "pve" and not game_state.game_over and game_state.current_player == 2
+        if pending_request is not None and (not ai_turn or game_state.move_history != pending_request[1]):
+            worker.cancel()
+            pending_request = None
+        if ai_turn and pending_request is None:
+            pending_request = (worker.request_move(game_state), list(game_state.move_history))
+
+        # 每帧轮询一次结果，只接受当前请求的着法
+        result = worker.poll()
+        if result is not None and pending_request is not None and result[0] == pending_request[0]:
+            pending_request = None
+            row, col = result[1]
+            play_move(game_state, row, col)
+
+        # 对局结束时保存；悔棋后重新下完的对局会再保存一次
+        if game_state.game_over and game_state.move_history != saved_history:
+            save_game(game_state)
+            saved_history = list(game_state.move_history)
+
+        # 绘制当前界面，没有变化时不重画
+        renderer.draw(game_state)
         clock.tick(FPS)
 
+    worker.shutdown()
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,277 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import signal
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .gomoku import AI, BOARD_SIZE, HARD_TIME_LIMIT, GameState
+    from .gomoku.book import BOOK_FILE
+    from .gomoku.shared_tt import SharedTranspositionTable
+except ImportError:
+    from gomoku import AI, BOARD_SIZE, HARD_TIME_LIMIT, GameState
+    from gomoku.book import BOOK_FILE
+    from gomoku.shared_tt import SharedTranspositionTable
+
+# 协议: 每行一个 JSON 请求，每行一个 JSON 应答，应答带回请求中的 id，同一连接上可以同时有多个请求
+#   {"id": 1, "moves": [[7, 7], [7, 8]], "difficulty": "hard", "time": 0.5, "nodes": null}
+#   -> {"id": 1, "move": [8, 8], "depth": 4, "nodes": 5210, "elapsed": 0.49}
+#   {"id": 2, "cmd": "stats"} -> 服务器累计的着法数、每秒着法数等
+# 着法按黑先交替排列，轮到谁走由着法数决定；出错时应答为 {"id": ..., "error": "..."}
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9315
+DIFFICULTIES = ("easy", "medium", "hard", "mcts")
+MAX_MOVE_TIME = 10.0  # 单步思考时间上限(秒)，防止一个请求长时间占住工作进程
+SERVER_TT_MB = 256  # 所有工作进程共享一张置换表，可以比单个 AI 的大
+
+# 工作进程中的全局对象，由进程池的 initializer 设置
+_worker_tts = {}
+_worker_ais = {}
+_worker_book = None
+
+
+def _init_server_worker(tt_name, book_path):
+    global _worker_book
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # 终端中的 Ctrl+C 由主进程处理，工作进程随进程池关闭
+    table = SharedTranspositionTable(name=tt_name)
+    _worker_tts.update({player: table.for_player(player) for player in (1, 2)})
+    _worker_book = book_path
+
+
+def _search_move(moves, difficulty, time_limit, node_limit):
+    """在工作进程中为一个局面选一步，返回 (row, col, 深度, 节点数, 用时)"""
+    start = time.perf_counter()
+    state = GameState()
+    state.sound_on = False
+    for row, col in moves:
+        if not state.make_move(row, col):
+            raise ValueError(f"着法 ({row}, {col}) 不合法")
+    if state.game_over:
+        raise ValueError("对局已经结束")
+    # 每个进程每种难度一个 AI，两方各用共享表的一个视图；开局库由 mmap 打开，各进程共用页缓存
+    ai = _worker_ais.get(difficulty)
+    if ai is None:
+        ai = _worker_ais[difficulty] = AI(difficulty, tts=_worker_tts, book=_worker_book)
+    ai.time_limit = time_limit
+    ai.node_limit = node_limit
+    row, col = ai.make_move(state)
+    return row, col, ai.last_depth, ai.last_nodes, time.perf_counter() - start
+
+
+def parse_moves(moves):
+    # 在主进程中只做格式检查，重建局面和判断合法性放到工作进程中
+    if not isinstance(moves, list) or len(moves) >= BOARD_SIZE * BOARD_SIZE:
+        raise ValueError("moves 应为 [[row, col], ...]")
+    parsed = []
+    for move in moves:
+        if (not isinstance(move, list) or len(move) != 2 or not all(type(v) is int for v in move)
+                or not all(0 <= v < BOARD_SIZE for v in move)):
+            raise ValueError(f"着法格式不正确: {move}")
+        parsed.append(tuple(move))
+    return parsed
+
+
+class MoveServer:
+    """
+    多局对弈服务: asyncio 负责所有连接，搜索分派到进程池
+    所有工作进程共用一张共享内存置换表和同一个开局库文件，不同对局中出现的相同局面可以互相复用搜索结果
+    """
+
+    def __init__(self, workers=None, tt_mb=SERVER_TT_MB, book=BOOK_FILE):
+        self.workers = workers or os.cpu_count() or 1
+        self.table = SharedTranspositionTable(tt_mb)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_server_worker,
+                                        initargs=(self.table.name, book))
+        self.started = time.perf_counter()
+        self.moves = 0
+        self.search_time = 0.0
+        self.connections = 0
+
+    def close(self):
+        try:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+        finally:
+            self.table.close()
+            self.table.unlink()
+
+    def stats(self):
+        uptime = time.perf_counter() - self.started
+        return {
+            "moves": self.moves,
+            "uptime": round(uptime, 3),
+            "moves_per_sec": round(self.moves / uptime, 2) if uptime > 0 else 0.0,
+            "avg_search_time": round(self.search_time / self.moves, 4) if self.moves else 0.0,
+            "workers": self.workers,
+            "tt_slots": self.table.size,
+            "connections": self.connections,
+        }
+
+    async def respond(self, request):
+        if request.get("cmd") == "stats":
+            return self.stats()
+        difficulty = request.get("difficulty", "hard")
+        if difficulty not in DIFFICULTIES:
+            raise ValueError(f"未知难度: {difficulty}")
+        moves = parse_moves(request.get("moves", []))
+        # json.loads 接受 NaN 和 Infinity，min(nan, ...) 仍是 nan，搜索永远不会超时，先拒绝非有限值
+        time_limit = float(request.get("time") or HARD_TIME_LIMIT)
+        if not math.isfinite(time_limit) or time_limit <= 0:
+            raise ValueError(f"time 应为正数: {request.get('time')}")
+        time_limit = min(time_limit, MAX_MOVE_TIME)
+        node_limit = request.get("nodes")
+        if node_limit is not None and (type(node_limit) is not int or node_limit <= 0):
+            raise ValueError(f"nodes 应为正整数: {node_limit}")
+        loop = asyncio.get_running_loop()
+        row, col, depth, nodes, elapsed = await loop.run_in_executor(
+            self.pool, _search_move, moves, difficulty, time_limit, node_limit)
+        self.moves += 1
+        self.search_time += elapsed
+        return {"move": [row, col], "depth": depth, "nodes": nodes, "elapsed": round(elapsed, 4)}
+
+    async def answer(self, line, writer):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("请求应为 JSON 对象")
+            request_id = request.get("id")
+            reply = await self.respond(request)
+        except (ValueError, TypeError) as e:
+            reply = {"error": str(e)}
+        except Exception as e:
+            # 工作进程崩溃(BrokenProcessPool)或引擎内部出错，也要应答，否则客户端会一直等这个 id
+            print(f"请求 {request_id} 出错:", file=sys.stderr)
+            traceback.print_exc()
+            reply = {"error": f"{type(e).__name__}: {e}"}
+        reply["id"] = request_id
+        if not writer.is_closing():
+            writer.write(json.dumps(reply, ensure_ascii=False).encode() + b"\n")
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):  # 行过长或连接被重置
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            # 客户端关闭写端后，已提交的请求仍然应答完再关闭连接
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self.connections -= 1
+            writer.close()
+
+
+async def serve(args):
+    server = MoveServer(args.workers, args.tt, args.book)
+    try:
+        listener = await asyncio.start_server(server.handle, args.host, args.port)
+        print(f"监听 {args.host}:{args.port}  工作进程: {server.workers}  共享置换表槽位: {server.table.size}")
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def random_opening(rng, plies):
+    # 在天元附近随机摆几手，让压测的各局下出不同的棋
+    moves = []
+    while len(moves) < plies:
+        move = [BOARD_SIZE // 2 + rng.randint(-2, 2), BOARD_SIZE // 2 + rng.randint(-2, 2)]
+        if move not in moves:
+            moves.append(move)
+    return moves
+
+
+async def bench_game(args, game_id, latencies):
+    """通过服务器下一局自我对弈(双方都由服务器走)，返回着法数"""
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    state = GameState()
+    state.sound_on = False
+    for row, col in random_opening(random.Random(args.seed + game_id), args.opening):
+        state.make_move(row, col)
+    played = 0
+    try:
+        while not state.game_over and len(state.move_history) < args.max_moves:
+            request = {"id": played, "moves": [[r, c] for r, c, _ in state.move_history],
+                       "difficulty": args.difficulty, "time": args.time}
+            start = time.perf_counter()
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+            if "error" in reply:
+                raise RuntimeError(reply["error"])
+            state.make_move(*reply["move"])
+            played += 1
+    finally:
+        writer.close()
+    return played
+
+
+async def bench(args):
+    latencies = []
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(bench_game(args, i, latencies) for i in range(args.games)))
+    wall = time.perf_counter() - start
+    total = sum(counts)
+    latencies.sort()
+    print(f"{args.games} 局并发，共 {total} 步，用时 {wall:.2f} 秒，每秒 {total / wall:.1f} 步")
+    if latencies:
+        p50 = latencies[len(latencies) // 2]
+        p90 = latencies[min(len(latencies) - 1, len(latencies) * 9 // 10)]
+        print(f"单步延迟: 中位数 {p50 * 1000:.1f} ms  p90 {p90 * 1000:.1f} ms  最长 {latencies[-1] * 1000:.1f} ms")
+
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    writer.write(b'{"cmd": "stats"}\n')
+    print("服务器统计:", (await reader.readline()).decode().strip())
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="五子棋 AI 服务: 同时为多局对弈计算着法")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    server = subparsers.add_parser("serve", help="启动服务")
+    server.add_argument("--workers", type=int, help="搜索进程数，默认 CPU 核数")
+    server.add_argument("--tt", type=int, default=SERVER_TT_MB, help="共享置换表大小(MB)")
+    server.add_argument("--book", default=BOOK_FILE, help="开局库文件")
+    server.set_defaults(func=serve)
+
+    load = subparsers.add_parser("bench", help="并发自我对弈，测量服务器每秒能走多少步")
+    load.add_argument("--games", type=int, default=16, help="同时进行的对局数")
+    load.add_argument("--difficulty", choices=DIFFICULTIES, default="hard")
+    load.add_argument("--time", type=float, default=0.2, help="每步思考时间(秒)")
+    load.add_argument("--opening", type=int, default=2, help="随机开局手数")
+    load.add_argument("--max-moves", type=int, default=80, help="每局最多手数")
+    load.add_argument("--seed", type=int, default=1)
+    load.set_defaults(func=bench)
+
+    for subparser in (server, load):
+        subparser.add_argument("--host", default=DEFAULT_HOST)
+        subparser.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+    args = parser.parse_args()
+    try:
+        asyncio.run(args.func(args))
+    except KeyboardInterrupt:
+        print("已停止", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
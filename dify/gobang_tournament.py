@@ -0,0 +1,257 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .gomoku import AI, BOARD_SIZE, GameState
+    from .gomoku.records import append_game, encode_game, game_result
+except ImportError:
+    from gomoku import AI, BOARD_SIZE, GameState
+    from gomoku.records import append_game, encode_game, game_result
+
+# 引擎配置写成 "难度:参数=值,..."，例如 hard:time=0.2 或 hard:time=none,nodes=20000,tt=16
+# 参数名到 AI 构造参数的映射；值为 none 表示不限
+ENGINE_OPTIONS = {
+    "time": ("time_limit", float),
+    "nodes": ("node_limit", int),
+    "tt": ("tt_mb", int),
+    "workers": ("workers", int),
+    "book": ("book", str),
+    "numpy": ("use_numpy", lambda value: value.lower() not in ("0", "false", "no")),
+}
+DIFFICULTIES = ("easy", "medium", "hard", "mcts")
+TOURNAMENT_TT_MB = 16  # 多个进程同时对弈，默认每个 AI 的置换表比界面中小
+
+# 战术题: (名称, 着法记录(黑先交替), 正确答案)，轮到谁走由着法数决定
+# VCF 题的答案是所有能开始连续冲四取胜的着法，防 VCF 题的答案是所有能让对方 VCF 失效的着法(均已穷举验证)
+TACTICS = [
+    ("连五", [(7, 5), (8, 5), (7, 6), (8, 6), (7, 7), (8, 7), (7, 8), (9, 9)], {(7, 4), (7, 9)}),
+    ("挡冲四", [(7, 5), (7, 4), (7, 6), (8, 8), (7, 7), (9, 9), (7, 8)], {(7, 9)}),
+    ("活三成活四", [(7, 6), (2, 2), (7, 7), (2, 12), (7, 8), (12, 2)], {(7, 5), (7, 9)}),
+    ("挡活三", [(7, 6), (2, 2), (7, 7), (2, 12), (7, 8)], {(7, 5), (7, 9)}),
+    ("四三", [(7, 5), (7, 4), (7, 6), (2, 2), (7, 7), (2, 12), (5, 8), (12, 2), (6, 8), (12, 12)], {(7, 8)}),
+    ("九手 VCF", [(6, 5), (5, 8), (4, 7), (5, 6), (5, 5), (4, 5), (6, 7), (6, 6), (5, 7), (3, 7), (8, 7), (4, 8),
+                 (7, 10), (7, 7), (7, 6), (5, 4), (9, 8), (10, 9), (8, 9), (1, 9), (10, 7), (6, 11), (5, 2), (11, 6),
+                 (8, 8), (8, 10)], {(8, 5)}),
+    ("十一手 VCF", [(5, 9), (7, 6), (5, 8), (5, 6), (5, 10), (5, 11), (8, 6), (7, 7), (7, 8), (8, 7), (8, 8), (6, 8),
+                  (9, 7), (6, 5), (9, 8), (10, 8), (7, 9), (10, 6), (6, 10), (4, 7), (3, 8), (6, 7), (5, 7), (6, 3),
+                  (6, 6), (4, 8), (2, 7)], {(4, 3), (8, 3)}),
+    ("防 VCF", [(7, 7), (8, 7), (7, 6), (7, 8), (9, 6), (8, 6), (8, 4), (8, 8), (8, 9), (6, 3), (9, 8), (9, 7),
+               (10, 7), (7, 10), (8, 5), (11, 8), (5, 8), (6, 7), (7, 5), (4, 10), (6, 10), (11, 5), (10, 6)],
+     {(7, 3), (7, 4), (9, 5)}),
+    ("防 VCF 二", [(6, 8), (5, 9), (5, 8), (4, 8), (6, 10), (6, 9), (7, 9), (6, 6), (5, 7), (4, 6), (8, 8), (5, 11),
+                 (7, 6)], {(7, 7), (7, 8), (9, 8)}),
+]
+
+
+def parse_engine(spec):
+    """把引擎配置字符串解析成 AI 的构造参数"""
+    difficulty, _, options = spec.partition(":")
+    if difficulty not in DIFFICULTIES:
+        raise ValueError(f"未知难度: {difficulty}")
+    kwargs = {"difficulty": difficulty, "tt_mb": TOURNAMENT_TT_MB}
+    for option in filter(None, options.split(",")):
+        name, _, value = option.partition("=")
+        if name not in ENGINE_OPTIONS:
+            raise ValueError(f"未知参数: {name}")
+        key, convert = ENGINE_OPTIONS[name]
+        kwargs[key] = None if value.lower() == "none" else convert(value)
+    return kwargs
+
+
+def random_opening(rng, plies):
+    # 在天元附近随机摆几手作为开局，让同一对引擎下出不同的对局
+    moves = []
+    while len(moves) < plies:
+        move = (BOARD_SIZE // 2 + rng.randint(-3, 3), BOARD_SIZE // 2 + rng.randint(-3, 3))
+        if move not in moves:
+            moves.append(move)
+    return moves
+
+
+def play_game(task):
+    """在工作进程中下一局，返回结果和双方每步的 (耗时, 节点数, 深度)"""
+    game_id, black, white, opening, seed, max_moves = task
+    ais = {1: AI(seed=seed, **parse_engine(black)), 2: AI(seed=seed + 1, **parse_engine(white))}
+    state = GameState()
+    state.sound_on = False
+    for row, col in opening:
+        state.make_move(row, col)
+    moves = {1: [], 2: []}
+    while not state.game_over and len(state.move_history) < max_moves:
+        player = state.current_player
+        ai = ais[player]
+        start = time.perf_counter()
+        row, col = ai.make_move(state)
+        moves[player].append((time.perf_counter() - start, ai.last_nodes, ai.last_depth))
+        if not state.make_move(row, col):
+            # 非法着法判负，正常情况下不会出现
+            state.winner = 3 - player
+            break
+    for ai in ais.values():
+        ai.close()
+    return {"game": game_id, "black": black, "white": white, "opening": opening, "winner": state.winner,
+            "result": game_result(state), "length": len(state.move_history), "history": state.move_history,
+            "moves": moves}
+
+
+def percentile(values, q):
+    # 最近秩法
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def score_interval(scores, z=1.96):
+    """平均得分(胜 1、和 0.5、负 0)及其 Wilson 95% 置信区间，全胜或全负时区间也不会退化成一个点"""
+    n = len(scores)
+    mean = sum(scores) / n
+    denom = 1 + z * z / n
+    centre = (mean + z * z / (2 * n)) / denom
+    margin = z * math.sqrt(mean * (1 - mean) / n + z * z / (4 * n * n)) / denom
+    return mean, max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def elo_difference(score):
+    if score <= 0:
+        return -float("inf")
+    if score >= 1:
+        return float("inf")
+    return -400 * math.log10(1 / score - 1)
+
+
+def make_tasks(engines, games, opening_plies, seed, max_moves):
+    # 循环赛: 每对引擎用同一批开局各执黑一次，抵消先手优势
+    rng = random.Random(seed)
+    tasks = []
+    for i, a in enumerate(engines):
+        for b in engines[i + 1:]:
+            for g in range(0, games, 2):
+                opening = random_opening(rng, opening_plies)
+                for black, white in ((a, b), (b, a))[:games - g]:
+                    game_seed = rng.getrandbits(32)
+                    tasks.append((len(tasks), black, white, opening, game_seed, max_moves))
+    return tasks
+
+
+def report_match(results, engines):
+    print(f"{'对局':<28}{'局数':>6}{'胜':>6}{'和':>6}{'负':>6}{'得分率':>8}{'95% 区间':>16}{'Elo 差':>9}")
+    for i, a in enumerate(engines):
+        for b in engines[i + 1:]:
+            scores = []
+            for r in results:
+                if {r["black"], r["white"]} != {a, b}:
+                    continue
+                a_colour = 1 if r["black"] == a else 2
+                scores.append(0.5 if r["winner"] == 0 else float(r["winner"] == a_colour))
+            if not scores:
+                continue
+            mean, low, high = score_interval(scores)
+            wins = scores.count(1.0)
+            draws = scores.count(0.5)
+            label = f"{a} vs {b}"
+            interval = f"[{low:.3f}, {high:.3f}]"
+            print(f"{label:<28}{len(scores):>6}{wins:>6}{draws:>6}{len(scores) - wins - draws:>6}"
+                  f"{mean:>8.3f}{interval:>16}{elo_difference(mean):>9.0f}")
+
+    print()
+    print(f"{'引擎':<28}{'步数':>7}{'节点/秒':>10}{'p50(ms)':>9}{'p90(ms)':>9}{'p99(ms)':>9}{'最长(ms)':>9}"
+          f"{'平均深度':>9}{'最大深度':>9}")
+    for engine in engines:
+        stats = [m for r in results for colour, name in ((1, r["black"]), (2, r["white"])) if name == engine
+                 for m in r["moves"][colour]]
+        if not stats:
+            continue
+        times = [t for t, _, _ in stats]
+        nodes = sum(n for _, n, _ in stats)
+        search_time = sum(t for t, n, _ in stats if n)
+        depths = [d for _, _, d in stats if d]
+        nps = nodes / search_time if search_time else 0
+        avg_depth = sum(depths) / len(depths) if depths else 0
+        print(f"{engine:<28}{len(stats):>7}{nps:>10.0f}{percentile(times, 50) * 1000:>9.1f}"
+              f"{percentile(times, 90) * 1000:>9.1f}{percentile(times, 99) * 1000:>9.1f}{max(times) * 1000:>9.1f}"
+              f"{avg_depth:>9.2f}{max(depths, default=0):>9}")
+
+
+def run_match(args):
+    for engine in args.engines:
+        parse_engine(engine)
+    if len(args.engines) < 2:
+        raise SystemExit("至少需要两个引擎配置")
+    tasks = make_tasks(args.engines, args.games, args.opening, args.seed, args.max_moves)
+    workers = args.workers or os.cpu_count() or 1
+    print(f"对局数: {len(tasks)}  进程数: {workers}  开局手数: {args.opening}  种子: {args.seed}")
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        for result in pool.map(play_game, tasks, chunksize=max(1, len(tasks) // (workers * 8))):
+            results.append(result)
+            if args.record:
+                append_game(args.record, encode_game(result["history"], result["result"],
+                                                     parse_engine(result["black"])["difficulty"],
+                                                     parse_engine(result["white"])["difficulty"]))
+            if len(results) % 50 == 0:
+                print(f"  已完成 {len(results)}/{len(tasks)}", file=sys.stderr)
+    print(f"用时 {time.perf_counter() - start:.1f} 秒")
+    print()
+    report_match(results, args.engines)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"engines": args.engines, "seed": args.seed, "results": results}, f)
+
+
+def run_tactics(args):
+    """每个引擎解一遍战术题，统计解对的题数和每题用时"""
+    engines = args.engines or list(DIFFICULTIES)
+    for engine in engines:
+        ai = AI(seed=args.seed, **parse_engine(engine))
+        solved = 0
+        print(f"== {engine}")
+        for name, moves, answers in TACTICS:
+            state = GameState()
+            state.sound_on = False
+            for row, col in moves:
+                state.make_move(row, col)
+            start = time.perf_counter()
+            move = ai.make_move(state)
+            elapsed = time.perf_counter() - start
+            ok = move in answers
+            solved += ok
+            print(f"  {'✓' if ok else '✗'} {name:<12}{str(move):>10}{elapsed * 1000:>10.1f} ms"
+                  f"  节点 {ai.last_nodes:>7}  深度 {ai.last_depth}")
+        ai.close()
+        print(f"  解出 {solved}/{len(TACTICS)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="五子棋 AI 自我对弈锦标赛和战术题测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    match = subparsers.add_parser("match", help="引擎之间循环赛")
+    match.add_argument("engines", nargs="+", help="引擎配置，如 easy medium hard:time=0.2")
+    match.add_argument("--games", type=int, default=100, help="每对引擎的对局数")
+    match.add_argument("--workers", type=int, help="并行对弈的进程数，默认 CPU 核数")
+    match.add_argument("--opening", type=int, default=2, help="随机开局的手数")
+    match.add_argument("--max-moves", type=int, default=BOARD_SIZE * BOARD_SIZE, help="超过手数判和")
+    match.add_argument("--seed", type=int, default=1)
+    match.add_argument("--json", help="把每局的原始结果写入 JSON 文件，便于比较改动前后")
+    match.add_argument("--record", help="把每局棋谱追加到对局日志，供 gobang_analyze.py 分析")
+    match.set_defaults(func=run_match)
+
+    tactics = subparsers.add_parser("tactics", help="战术题测试")
+    tactics.add_argument("engines", nargs="*", help=f"引擎配置，默认所有难度({'、'.join(DIFFICULTIES)})")
+    tactics.add_argument("--seed", type=int, default=1)
+    tactics.set_defaults(func=run_tactics)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
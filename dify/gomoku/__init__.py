@@ -0,0 +1,14 @@
+"""五子棋引擎: 规则、位棋盘和各难度 AI，只依赖标准库，不需要 pygame 或显示设备
+
+多进程并行搜索在 gomoku.parallel 中，导入 multiprocessing 较慢，按需导入
+"""
+from .board import BOARD_SIZE, BitBoard
+from .state import GameState
+from .search import HARD_TIME_LIMIT, WIN_SCORE, MinimaxSearch, SearchTimeout, TranspositionTable
+from .threats import ThreatSearch
+from .ai import AI, AIWorker
+
+__all__ = [
+    "BOARD_SIZE", "BitBoard", "GameState", "HARD_TIME_LIMIT", "WIN_SCORE", "MinimaxSearch", "SearchTimeout",
+    "TranspositionTable", "ThreatSearch", "AI", "AIWorker",
+]
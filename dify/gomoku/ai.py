@@ -0,0 +1,343 @@
+"""各难度的 AI，以及在后台线程中思考和预想的 AIWorker"""
+import queue
+import random
+import threading
+import time
+
+from .board import BOARD_SIZE
+from .book import BOOK_FILE, open_book
+from .mcts import MonteCarloSearch
+from .search import HARD_TIME_LIMIT, MinimaxSearch, TranspositionTable
+from .state import GameState
+from .stats import SearchStats
+from .threats import THREAT_TIME_SHARE, ThreatSearch
+
+# AI逻辑
+class AI:
+    def __init__(self, difficulty="medium", tt_mb=64, time_limit=HARD_TIME_LIMIT, node_limit=None, workers=1,
+                 seed=None, use_numpy=True, book=BOOK_FILE, tts=None, on_stats=None, profile=None):
+        self.difficulty = difficulty
+        self.rng = random.Random(seed)  # 简单难度的随机落子，固定种子时对局可以复现
+        # 跨回合保留，后续搜索可以复用之前的结果；也可以传入外部的 {执棋方: 表}(例如多进程共享的置换表)
+        # 搜索按自己一方的视角记分值，同一个 AI 为两方走子时每方一张表，第一次执该方时才创建
+        self.tt_mb = tt_mb
+        self.tts = {} if tts is None else tts
+        # 困难难度的每步预算，时间(秒)和节点数任一用完即返回目前最佳着法
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        # 上一步的搜索深度和节点数(含威胁空间搜索)，简单和中等难度不搜索，均为 0；完整的统计在 last_stats 中
+        self.last_depth = 0
+        self.last_nodes = 0
+        self.last_stats = None
+        self.on_stats = on_stats  # 每步走完后以 SearchStats 调用，例如 stats.jsonl_hook(文件)
+        # profile 为文件路径时用 cProfile 记录每一步，累计结果在每步之后写入该文件(可用 pstats 或 snakeviz 查看)
+        self.profile = profile
+        self.profiler = None
+        if profile is not None:
+            import cProfile
+            self.profiler = cProfile.Profile()
+        self.stop_event = None  # 在后台线程中运行时由 AIWorker 设置，用于中途取消搜索
+        # workers 大于 1 时困难难度使用多进程根节点并行搜索，进程池在第一次使用时创建
+        self.workers = workers
+        self.parallel = None
+        self.mcts = None  # 蒙特卡洛难度的搜索树，跨回合保留
+        self.use_numpy = use_numpy  # 中等难度用 NumPy 一次算出全盘分值，未安装时逐格查表
+        # 困难难度的开局库文件，第一次用到时打开；为 None 或文件不存在时不用开局库
+        self.book_path = book
+        self.book = None
+
+    def close(self):
+        # 关闭并行搜索的进程池和开局库
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+        if self.mcts is not None:
+            self.mcts.close()
+            self.mcts = None
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+
+    def tt(self, player):
+        table = self.tts.get(player)
+        if table is None:
+            table = self.tts[player] = TranspositionTable(self.tt_mb)
+        return table
+
+    def opening_book(self):
+        if self.book is None and self.book_path is not None:
+            self.book = open_book(self.book_path)
+            if self.book is None:
+                self.book_path = None  # 只尝试打开一次
+        return self.book
+
+    def make_move(self, game_state):
+        # AI 执当前轮到的一方，人机对战中是白方，自我对弈时黑白都可以
+        stats = self.last_stats = SearchStats(self.difficulty, game_state.current_player)
+        if self.profiler is not None:
+            self.profiler.enable()
+        try:
+            if self.difficulty == "easy":
+                move = self.easy_ai(game_state)
+            elif self.difficulty == "medium":
+                move = self.medium_ai(game_state)
+            elif self.difficulty == "mcts":
+                move = self.mcts_ai(game_state)
+            else:
+                move = self.hard_ai(game_state)
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+                self.profiler.dump_stats(self.profile)
+        stats.move = move
+        self.last_depth = stats.depth
+        self.last_nodes = stats.nodes
+        if self.on_stats is not None:
+            self.on_stats(stats)
+        return move
+
+    @staticmethod
+    def candidate_cells(board):
+        # 三种难度共用位棋盘增量维护的候选集合，只考虑已有棋子附近的空位
+        return [divmod(idx, BOARD_SIZE) for idx in board.candidate_moves()]
+
+    @staticmethod
+    def find_winning_move(board, empty_cells, player):
+        # 位棋盘的威胁索引记录了所有一步成五的空位，通常为空，此时不必逐个检查候选
+        wins = board.five_cells[player]
+        if not wins:
+            return None
+        for r, c in empty_cells:
+            if r * BOARD_SIZE + c in wins:
+                return r, c
+        return None
+
+    def instant_move(self, board, player):
+        """三种难度共用的第一步: 返回 (候选空位, 自己能成五或必须挡住的着法，没有时为 None)"""
+        stats = self.last_stats
+        with stats.phase("instant"):
+            empty_cells = self.candidate_cells(board)
+
+            # 检查是否有立即获胜的机会
+            move = self.find_winning_move(board, empty_cells, player)
+            if move:
+                stats.source = "win"
+                return empty_cells, move
+
+            # 检查是否需要阻止玩家
+            move = self.find_winning_move(board, empty_cells, 3 - player)
+            if move:
+                stats.source = "block"
+            return empty_cells, move
+
+    def easy_ai(self, game_state):
+        # 随机落子，但会阻止玩家即将获胜的情况
+        board = game_state.bitboard
+        empty_cells, move = self.instant_move(board, game_state.current_player)
+        if move:
+            return move
+
+        # 在已有棋子附近随机选择
+        self.last_stats.source = "random"
+        return self.rng.choice(empty_cells)
+
+    def medium_ai(self, game_state):
+        board = game_state.bitboard
+        player = game_state.current_player
+        empty_cells, move = self.instant_move(board, player)
+        if move:
+            return move
+
+        self.last_stats.source = "score"
+        with self.last_stats.phase("evaluation"):
+            return self.score_cells(board, empty_cells, player)
+
+    def score_cells(self, board, empty_cells, player):
+        # 选攻防分最高的候选空位
+        if self.use_numpy:
+            # numpy 导入较慢，第一次用到时才导入
+            from .vector import HAVE_NUMPY, np, score_maps
+            if HAVE_NUMPY:
+                # 按候选顺序取出全盘分值，argmax 返回第一个最大值，与下面逐格比较的结果相同
+                attack, defense = score_maps(board)[[player - 1, 2 - player]].reshape(2, -1)
+                cells = np.array([r * BOARD_SIZE + c for r, c in empty_cells])
+                total = attack[cells] + defense[cells] * 0.8
+                return divmod(int(cells[total.argmax()]), BOARD_SIZE)
+
+        # 评估每个候选空位
+        best_score = -1
+        best_move = None
+
+        for r, c in empty_cells:
+            # 每个方向一次查表，同时得到进攻得分和防守得分
+            _, attack_score, _, defense_score = board.threats(r, c, player)
+            total_score = attack_score + defense_score * 0.8  # 稍微偏重防守
+
+            if total_score > best_score:
+                best_score = total_score
+                best_move = (r, c)
+
+        return best_move
+
+    def hard_ai(self, game_state):
+        board = game_state.bitboard
+        player = game_state.current_player
+        stats = self.last_stats
+        _, move = self.instant_move(board, player)
+        if move:
+            return move
+
+        # 开局库中有这个局面(或它的对称局面)时直接走库中的着法
+        with stats.phase("book"):
+            book = self.opening_book()
+            idx = None if book is None else book.probe(board)
+        if idx is not None:
+            stats.source = "book"
+            return divmod(idx, BOARD_SIZE)
+
+        # 先用威胁空间搜索找连续进攻: 自己的 VCF、挡住对方的 VCF/VCT、自己的 VCT
+        start = time.perf_counter()
+        threat_time = None if self.time_limit is None else self.time_limit * THREAT_TIME_SHARE
+        with stats.phase("threats"):
+            threats = ThreatSearch(board, time_limit=threat_time, stop_event=self.stop_event)
+            line = threats.vcf(player)
+            stats.source = "vcf"
+            if line is None:
+                defence = threats.find_defence(player)
+                if defence is not None:
+                    line = [defence]
+                    stats.source = "defence"
+                else:
+                    line = threats.vct(player)
+                    stats.source = "vct"
+        stats.nodes = stats.threat_nodes = threats.nodes
+        if line:
+            return divmod(line[0], BOARD_SIZE)
+
+        # 在时间/节点预算内迭代加深搜索，记录达到的深度
+        stats.source = "search"
+        search_time = None if self.time_limit is None else max(self.time_limit - (time.perf_counter() - start), 0)
+        if self.workers > 1:
+            if self.parallel is None:
+                # multiprocessing 导入较慢，只在真正使用并行搜索时才导入
+                from .parallel import ParallelSearch
+                self.parallel = ParallelSearch(self.workers)
+            # 工作进程中的剪枝和置换表计数不传回主进程，只统计节点数和深度
+            with stats.phase("search"):
+                best_move = self.parallel.search(game_state.move_history, player, search_time,
+                                                 stop_event=self.stop_event)
+            stats.depth = self.parallel.depth
+            stats.nodes += self.parallel.nodes
+            return divmod(best_move, BOARD_SIZE)
+
+        search = MinimaxSearch(board, self.tt(player), player, search_time, self.node_limit, stop_event=self.stop_event)
+        with stats.phase("search"):
+            best_move = search.run()
+        stats.add_search(search)
+        return divmod(best_move, BOARD_SIZE)
+
+    def mcts_ai(self, game_state):
+        # 蒙特卡洛树搜索，与困难难度使用同样的时间/节点预算(节点数按模拟次数计)，便于在同等条件下对比
+        board = game_state.bitboard
+        player = game_state.current_player
+        stats = self.last_stats
+        _, move = self.instant_move(board, player)
+        if move:
+            return move
+
+        if self.mcts is None:
+            self.mcts = MonteCarloSearch(self.workers, seed=self.rng.getrandbits(32))
+        time_limit = self.time_limit
+        if time_limit is None and self.node_limit is None:
+            time_limit = HARD_TIME_LIMIT  # 两种预算都不限时搜索不会停止
+        stats.source = "mcts"
+        with stats.phase("search"):
+            best_move = self.mcts.search(board, game_state.move_history, player, time_limit, self.node_limit,
+                                         self.stop_event)
+        stats.nodes = self.mcts.playouts
+        stats.depth = self.mcts.depth
+        return divmod(best_move, BOARD_SIZE)
+
+
+# 后台思考
+class AIWorker(threading.Thread):
+    """
+    在后台线程中运行 AI，主循环通过队列提交局面、每帧轮询结果，窗口在 AI 思考时保持刷新
+    困难难度走完一步后会在对手思考期间继续预想(pondering)，预想结果写入置换表供下一步复用
+    """
+
+    def __init__(self, ai, ponder=True):
+        super().__init__(daemon=True)
+        self.ai = ai
+        self.ponder = ponder
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.stop_event = threading.Event()
+        self.ai.stop_event = self.stop_event
+        self.next_id = 0
+
+    def request_move(self, game_state):
+        """提交当前局面，返回请求编号；结果稍后通过 poll() 取回"""
+        self.next_id += 1
+        self.stop_event.set()  # 打断正在进行的预想或已作废的搜索
+        self.requests.put((self.next_id, list(game_state.move_history), game_state.ai_difficulty))
+        return self.next_id
+
+    def cancel(self):
+        # 悔棋、重新开始或回到菜单时调用，正在进行的搜索尽快结束，它的结果由请求编号过滤掉
+        self.stop_event.set()
+
+    def poll(self):
+        """非阻塞地取回 (请求编号, 着法)，没有结果时返回 None"""
+        try:
+            return self.results.get_nowait()
+        except queue.Empty:
+            return None
+
+    def shutdown(self):
+        self.stop_event.set()
+        self.requests.put(None)
+
+    def run(self):
+        ponder_history = None
+        while True:
+            if ponder_history is not None:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    self.ponder_on(ponder_history)
+                    ponder_history = None
+                    continue
+            else:
+                request = self.requests.get()
+            if request is None:
+                self.ai.close()
+                break
+
+            request_id, move_history, difficulty = request
+            self.stop_event.clear()
+            state = GameState.from_history(move_history)
+            self.ai.difficulty = difficulty
+            move = self.ai.make_move(state)
+            self.results.put((request_id, move))
+            if self.ponder and difficulty == "hard":
+                ponder_history = move_history + [(move[0], move[1], state.current_player)]
+
+    def ponder_on(self, move_history):
+        # 猜测对手最可能的应对(置换表中的最佳着法或攻防分最高的点)，在该局面上不限时搜索直到被打断
+        state = GameState.from_history(move_history)
+        if state.game_over:
+            return
+        board = state.bitboard
+        # 刚才的搜索以 AI 一方的视角写入，对手的应对也记在这张表中
+        table = self.ai.tt(3 - state.current_player)
+        entry = table.probe(board.hash)
+        if entry is not None and entry[4] is not None and board.cells[entry[4]] == 0:
+            guess = entry[4]
+        else:
+            guess = max(board.candidate_moves(), key=lambda idx: board.move_priority(idx, state.current_player))
+        if not state.make_move(*divmod(guess, BOARD_SIZE)) or state.game_over:
+            return
+        search = MinimaxSearch(state.bitboard, table, state.current_player, time_limit=None,
+                               stop_event=self.stop_event)
+        search.run()
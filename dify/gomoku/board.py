@@ -0,0 +1,434 @@
+"""位棋盘: 棋盘几何、Zobrist 哈希、棋形判定和查找表，以及增量维护棋形分值的 BitBoard"""
+import os
+import random
+
+BOARD_SIZE = 15
+
+# 位棋盘几何: 每条线(行、列、两条对角线)上的棋子用一个整数位掩码表示
+# 横线 id = row, 位 = col; 竖线 id = 15 + col, 位 = row
+# 对角线 id = 30 + (col - row + 14), 位 = row; 反对角线 id = 59 + (row + col), 位 = row
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+LINE_COUNT = 2 * BOARD_SIZE + 2 * (2 * BOARD_SIZE - 1)
+
+
+def _line_of(row, col, direction):
+    if direction == 0:
+        return row, col
+    if direction == 1:
+        return BOARD_SIZE + col, row
+    if direction == 2:
+        return 2 * BOARD_SIZE + col - row + BOARD_SIZE - 1, row
+    return 2 * BOARD_SIZE + 2 * BOARD_SIZE - 1 + row + col, row
+
+
+# CELL_LINES[idx] = 该格所在四条线的 (线id, 位, 位掩码)
+CELL_LINES = []
+# LINE_CELLS[线id][位] = (row, col)
+LINE_CELLS = [[None] * BOARD_SIZE for _ in range(LINE_COUNT)]
+# LINE_MASKS[线id] = 该线在棋盘内的位
+LINE_MASKS = [0] * LINE_COUNT
+
+for _r in range(BOARD_SIZE):
+    for _c in range(BOARD_SIZE):
+        _entries = []
+        for _d in range(4):
+            _lid, _bit = _line_of(_r, _c, _d)
+            LINE_CELLS[_lid][_bit] = (_r, _c)
+            LINE_MASKS[_lid] |= 1 << _bit
+            _entries.append((_lid, _bit, 1 << _bit))
+        CELL_LINES.append(tuple(_entries))
+
+
+# NEIGHBOURS[idx] = 切比雪夫距离 2 以内的邻格 (邻格idx, 权重)，相邻格权重 2，隔一格权重 1
+NEIGHBOURS = []
+for _r in range(BOARD_SIZE):
+    for _c in range(BOARD_SIZE):
+        NEIGHBOURS.append(tuple(
+            ((_r + _dr) * BOARD_SIZE + _c + _dc, 2 if max(abs(_dr), abs(_dc)) == 1 else 1)
+            for _dr in range(-2, 3) for _dc in range(-2, 3)
+            if (_dr or _dc) and 0 <= _r + _dr < BOARD_SIZE and 0 <= _c + _dc < BOARD_SIZE
+        ))
+CENTER = (BOARD_SIZE // 2) * BOARD_SIZE + BOARD_SIZE // 2
+
+# Zobrist 随机数表: ZOBRIST[player][idx]，固定种子保证不同进程的哈希一致
+_zobrist_rng = random.Random(20240615)
+ZOBRIST = [None] + [[_zobrist_rng.getrandbits(64) for _ in range(BOARD_SIZE * BOARD_SIZE)] for _ in range(2)]
+
+# 棋盘的 8 种对称变换(4 种旋转 x 是否镜像): SYMMETRIES[s][idx] = 变换后的格子，SYMMETRY_INVERSE[s] 为其逆变换
+SYMMETRIES = []
+for _s in range(8):
+    _mapping = []
+    for _idx in range(BOARD_SIZE * BOARD_SIZE):
+        _r, _c = divmod(_idx, BOARD_SIZE)
+        if _s >= 4:
+            _c = BOARD_SIZE - 1 - _c
+        for _ in range(_s % 4):
+            _r, _c = _c, BOARD_SIZE - 1 - _r
+        _mapping.append(_r * BOARD_SIZE + _c)
+    SYMMETRIES.append(tuple(_mapping))
+SYMMETRY_INVERSE = []
+for _mapping in SYMMETRIES:
+    _inverse = [0] * len(_mapping)
+    for _idx, _target in enumerate(_mapping):
+        _inverse[_target] = _idx
+    SYMMETRY_INVERSE.append(tuple(_inverse))
+
+
+def run_bounds(mask, bit):
+    """返回掩码中包含 bit 的连续 1 的起止位 (lo, hi)，bit 必须已置位"""
+    x = mask >> bit
+    hi = bit + (~x & (x + 1)).bit_length() - 2
+    low_bits = (1 << (bit + 1)) - 1
+    lo = (~mask & low_bits).bit_length()
+    return lo, hi
+
+
+# 单条线上的棋形，数值越大威胁越大；每条线每个玩家只计最强的一种棋形，避免重复计分
+SHAPE_NONE = 0
+SHAPE_ONE = 1
+SHAPE_TWO = 2  # 眠二
+SHAPE_OPEN_TWO = 3  # 活二
+SHAPE_THREE = 4  # 眠三
+SHAPE_OPEN_THREE = 5  # 活三
+SHAPE_FOUR = 6  # 冲四(含跳四)
+SHAPE_OPEN_FOUR = 7  # 活四(或同线双四)
+SHAPE_FIVE = 8
+# 五连的分值大于其余所有线分值之和的上限(88 条线 x 10000)，合计分值超过它即说明已经成五
+SHAPE_SCORES = [0, 1, 10, 100, 100, 1000, 1000, 10000, 1000000]
+
+# 一条线上所有长度为 5 的窗口，以及线外(棋盘边界以外)的位
+FIVE_WINDOWS = [0x1F << s for s in range(BOARD_SIZE - 4)]
+LINE_EDGES = [((1 << BOARD_SIZE) - 1) & ~mask for mask in LINE_MASKS]
+
+# 整条线的棋形缓存(按线状态)，以及空白段的棋形缓存(按段长和段内己方棋子)
+_line_shape_cache = {}
+_segment_shape_cache = {}
+
+
+def clear_shape_caches():
+    """清空棋形缓存，基准测试用来让各种模式从同样的冷缓存开始"""
+    _line_shape_cache.clear()
+    _segment_shape_cache.clear()
+
+
+def _five_completions(own, blocked):
+    """返回再落一子即可成五的空位掩码，已经成五时返回 -1"""
+    result = 0
+    for window in FIVE_WINDOWS:
+        if blocked & window:
+            continue
+        n = (own & window).bit_count()
+        if n == 5:
+            return -1
+        if n == 4:
+            result |= window & ~own
+    return result
+
+
+def segment_shape(own, length):
+    """
+    判断长度为 length 的无阻挡线段上 own 的最强棋形
+    按"再落一子能形成什么"递归定义: 能成活四的是活三，能成冲四的是眠三，依此类推
+    """
+    key = own | length << BOARD_SIZE
+    shape = _segment_shape_cache.get(key)
+    if shape is not None:
+        return shape
+
+    blocked = ((1 << BOARD_SIZE) - 1) & ~((1 << length) - 1)
+    wins = _five_completions(own, blocked)
+    if wins < 0:
+        shape = SHAPE_FIVE
+    elif wins:
+        shape = SHAPE_OPEN_FOUR if wins & (wins - 1) else SHAPE_FOUR
+    else:
+        # 只有和己方棋子处在同一个可成五窗口里的空位才值得尝试
+        room = 0
+        for window in FIVE_WINDOWS:
+            if not blocked & window and own & window:
+                room |= window & ~own
+        shape = SHAPE_ONE if room else SHAPE_NONE
+        while room:
+            bit = room & -room
+            room ^= bit
+            grown = segment_shape(own | bit, length)
+            if grown == SHAPE_OPEN_FOUR:
+                shape = SHAPE_OPEN_THREE
+                break
+            if grown == SHAPE_FOUR:
+                shape = max(shape, SHAPE_THREE)
+            elif grown == SHAPE_OPEN_THREE:
+                shape = max(shape, SHAPE_OPEN_TWO)
+            elif grown == SHAPE_THREE:
+                shape = max(shape, SHAPE_TWO)
+
+    _segment_shape_cache[key] = shape
+    return shape
+
+
+def line_shape(own, blocked):
+    """
+    判断一条线上 own 的最强棋形，blocked 为对方棋子和棋盘外的位
+    五连窗口不会跨过阻挡位，所以按阻挡位把线切成空白段，取各段棋形的最大值
+    """
+    key = own | blocked << BOARD_SIZE
+    shape = _line_shape_cache.get(key)
+    if shape is not None:
+        return shape
+
+    shape = SHAPE_NONE
+    free = ~blocked & ((1 << BOARD_SIZE) - 1)
+    while free:
+        start = (free & -free).bit_length() - 1
+        x = free >> start
+        length = (~x & (x + 1)).bit_length() - 1
+        seg_mask = (1 << length) - 1
+        if length >= 5 and own >> start & seg_mask:
+            shape = max(shape, segment_shape(own >> start & seg_mask, length))
+        free &= ~(seg_mask << start)
+
+    # 防止长时间运行时缓存无限增长
+    if len(_line_shape_cache) > 1 << 20:
+        _line_shape_cache.clear()
+    _line_shape_cache[key] = shape
+    return shape
+
+
+# 棋形查找表: 以某点为中心、沿一个方向的 9 格窗口按三进制编码(0 空, 1 己方, 2 对方或棋盘外)
+# 查找表[编码] = 己方落在中心后在该窗口内形成的棋形，第一次使用时从磁盘缓存读取，不存在时构建一次
+PATTERN_WINDOW = 9
+PATTERN_VERSION = 1
+PATTERN_MAGIC = b"GMKP" + bytes([PATTERN_VERSION])
+PATTERN_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gobang_patterns.bin")
+# 窗口左右各 4 格可能越出线外，先把线掩码左移 4 位再补上线外的阻挡位
+WINDOW_PAD = 0xF | (0xF << (BOARD_SIZE + 4))
+# TERNARY[9 位掩码] = 把掩码的每一位当作三进制数位得到的值
+TERNARY = [sum(3 ** i for i in range(PATTERN_WINDOW) if m >> i & 1) for m in range(1 << PATTERN_WINDOW)]
+
+
+def _build_pattern_table():
+    table = bytearray(3 ** PATTERN_WINDOW)
+    center = 1 << (PATTERN_WINDOW // 2)
+    outside = ((1 << BOARD_SIZE) - 1) & ~((1 << PATTERN_WINDOW) - 1)
+    for code in range(len(table)):
+        own = blocked = 0
+        x = code
+        for i in range(PATTERN_WINDOW):
+            x, digit = divmod(x, 3)
+            if digit == 1:
+                own |= 1 << i
+            elif digit == 2:
+                blocked |= 1 << i
+        if (own | blocked) & center:
+            continue
+        table[code] = line_shape(own | center, blocked | outside)
+    return bytes(table)
+
+
+def load_pattern_table(path=PATTERN_CACHE_FILE):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(PATTERN_MAGIC)] == PATTERN_MAGIC and len(data) == len(PATTERN_MAGIC) + 3 ** PATTERN_WINDOW:
+            return data[len(PATTERN_MAGIC):]
+    except OSError:
+        pass
+
+    table = _build_pattern_table()
+    # 先写临时文件再替换，多个进程同时启动时不会读到写了一半的缓存；目录不可写时只在内存中使用
+    try:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(PATTERN_MAGIC + table)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    return table
+
+
+_pattern_table = None
+
+
+def pattern_table():
+    # 延迟到第一次创建棋盘时再加载，只用到规则或着法记录时导入模块不需要读写缓存文件
+    global _pattern_table
+    if _pattern_table is None:
+        _pattern_table = load_pattern_table()
+    return _pattern_table
+
+
+class BitBoard:
+    """紧凑棋盘引擎: 每个玩家在每条线上的棋子存成位掩码，判胜和扫描都变成移位与按位与"""
+
+    def __init__(self):
+        self.cells = bytearray(BOARD_SIZE * BOARD_SIZE)
+        self.lines = [None, [0] * LINE_COUNT, [0] * LINE_COUNT]
+        self.count = 0
+        self.hash = 0  # 当前局面的 Zobrist 哈希，随落子/提子增量更新
+        # 候选着法: 距离任意棋子 2 格以内的空位，near 记录每格周围棋子的加权数量
+        self.near = [0] * (BOARD_SIZE * BOARD_SIZE)
+        self.candidates = set()
+        # 增量评估: 每条线上每个玩家的最强棋形及其分值，以及全盘合计
+        self.line_shapes = [None, [SHAPE_NONE] * LINE_COUNT, [SHAPE_NONE] * LINE_COUNT]
+        self.line_scores = [None, [0] * LINE_COUNT, [0] * LINE_COUNT]
+        self.scores = [None, 0, 0]
+        # 威胁索引: 每条线上每个玩家再落一子即可成五的空位掩码，以及每个这样的空位在几条线上成五
+        # 只在冲四、活四的线上非零，判断立即取胜或必须挡的点不必再扫描空位
+        self.line_fives = [None, [0] * LINE_COUNT, [0] * LINE_COUNT]
+        self.five_cells = [None, {}, {}]
+        self.patterns = pattern_table()
+
+    def get(self, row, col):
+        return self.cells[row * BOARD_SIZE + col]
+
+    def place(self, row, col, player):
+        idx = row * BOARD_SIZE + col
+        self.cells[idx] = player
+        lines = self.lines[player]
+        for lid, _, bit_mask in CELL_LINES[idx]:
+            lines[lid] |= bit_mask
+            self._rescore_line(lid)
+        self.count += 1
+        self.hash ^= ZOBRIST[player][idx]
+
+        cells = self.cells
+        near = self.near
+        candidates = self.candidates
+        candidates.discard(idx)
+        for n, weight in NEIGHBOURS[idx]:
+            near[n] += weight
+            if cells[n] == 0:
+                candidates.add(n)
+
+    def remove(self, row, col):
+        idx = row * BOARD_SIZE + col
+        player = self.cells[idx]
+        self.cells[idx] = 0
+        lines = self.lines[player]
+        for lid, _, bit_mask in CELL_LINES[idx]:
+            lines[lid] &= ~bit_mask
+            self._rescore_line(lid)
+        self.count -= 1
+        self.hash ^= ZOBRIST[player][idx]
+
+        near = self.near
+        candidates = self.candidates
+        for n, weight in NEIGHBOURS[idx]:
+            near[n] -= weight
+            if near[n] == 0:
+                candidates.discard(n)
+        if near[idx]:
+            candidates.add(idx)
+
+    def point_shapes(self, row, col, player):
+        """查表得到 player 落在空位 (row, col) 后四个方向上各自形成的棋形"""
+        own_lines = self.lines[player]
+        opp_lines = self.lines[3 - player]
+        shapes = []
+        for lid, bit, _ in CELL_LINES[row * BOARD_SIZE + col]:
+            own = (own_lines[lid] << 4 >> bit) & 0x1FF
+            blocked = ((((opp_lines[lid] | LINE_EDGES[lid]) << 4) | WINDOW_PAD) >> bit) & 0x1FF
+            shapes.append(self.patterns[TERNARY[own] + 2 * TERNARY[blocked]])
+        return shapes
+
+    def point_score(self, row, col, player):
+        return sum(SHAPE_SCORES[shape] for shape in self.point_shapes(row, col, player))
+
+    def move_priority(self, idx, player):
+        # 着法排序用: 该点对自己的进攻分加上对对方的防守分
+        row, col = divmod(idx, BOARD_SIZE)
+        _, attack_score, _, defense_score = self.threats(row, col, player)
+        return attack_score + defense_score
+
+    def threats(self, row, col, player):
+        """返回空位 (row, col) 对进攻方 player 和防守方各自的最强棋形及分值"""
+        attack = self.point_shapes(row, col, player)
+        defend = self.point_shapes(row, col, 3 - player)
+        return (max(attack), sum(SHAPE_SCORES[shape] for shape in attack),
+                max(defend), sum(SHAPE_SCORES[shape] for shape in defend))
+
+    def _rescore_line(self, lid):
+        # 只重新计算经过变化格子的线，双方的棋形都可能因为这一子改变
+        black = self.lines[1][lid]
+        white = self.lines[2][lid]
+        edge = LINE_EDGES[lid]
+        line_shapes = self.line_shapes
+        line_scores = self.line_scores
+        scores = self.scores
+        line_fives = self.line_fives
+        shape = line_shapes[1][lid] = line_shape(black, white | edge)
+        score = SHAPE_SCORES[shape]
+        scores[1] += score - line_scores[1][lid]
+        line_scores[1][lid] = score
+        if shape == SHAPE_FOUR or shape == SHAPE_OPEN_FOUR or line_fives[1][lid]:
+            self._update_fives(1, lid, black, white | edge, shape)
+        shape = line_shapes[2][lid] = line_shape(white, black | edge)
+        score = SHAPE_SCORES[shape]
+        scores[2] += score - line_scores[2][lid]
+        line_scores[2][lid] = score
+        if shape == SHAPE_FOUR or shape == SHAPE_OPEN_FOUR or line_fives[2][lid]:
+            self._update_fives(2, lid, white, black | edge, shape)
+
+    def _update_fives(self, player, lid, own, blocked, shape):
+        # 按新旧掩码的差异增减空位计数，计数归零的空位从索引中删除
+        wins = _five_completions(own, blocked) if shape == SHAPE_FOUR or shape == SHAPE_OPEN_FOUR else 0
+        old = self.line_fives[player][lid]
+        if wins == old:
+            return
+        self.line_fives[player][lid] = wins
+        cells = self.five_cells[player]
+        line_cells = LINE_CELLS[lid]
+        changed = wins ^ old
+        while changed:
+            bit = changed & -changed
+            changed ^= bit
+            r, c = line_cells[bit.bit_length() - 1]
+            idx = r * BOARD_SIZE + c
+            if wins & bit:
+                cells[idx] = cells.get(idx, 0) + 1
+            elif cells[idx] == 1:
+                del cells[idx]
+            else:
+                cells[idx] -= 1
+
+    def canonical_hash(self):
+        """
+        返回 (规范哈希, 对称变换编号): 8 种对称局面的 Zobrist 哈希中最小的一个，对称的局面得到相同的规范哈希
+        逐个棋子重新计算，只在棋子很少的开局(查开局库)时使用
+        """
+        stones = [(idx, player) for idx, player in enumerate(self.cells) if player]
+        best = None
+        for sym, mapping in enumerate(SYMMETRIES):
+            key = 0
+            for idx, player in stones:
+                key ^= ZOBRIST[player][mapping[idx]]
+            if best is None or key < best[0]:
+                best = (key, sym)
+        return best
+
+    def candidate_moves(self):
+        """返回候选空位(idx)，按周围棋子的加权数量从高到低排序，同分时按行优先"""
+        if not self.candidates:
+            if self.count == 0:
+                return [CENTER]
+            return [idx for idx in range(BOARD_SIZE * BOARD_SIZE) if self.cells[idx] == 0]
+        return sorted(sorted(self.candidates), key=self.near.__getitem__, reverse=True)
+
+    def is_full(self):
+        return self.count == BOARD_SIZE * BOARD_SIZE
+
+    def winning_cells(self, player):
+        """返回 player 再落一子即可成五的空位(idx)，直接读取增量维护的威胁索引"""
+        return sorted(self.five_cells[player])
+
+    def five_line(self, row, col, player):
+        """返回经过 (row, col) 的五连(或更长)棋子坐标，没有则返回空列表"""
+        lines = self.lines[player]
+        for lid, bit, bit_mask in CELL_LINES[row * BOARD_SIZE + col]:
+            m = lines[lid]
+            if not m & bit_mask:
+                continue
+            lo, hi = run_bounds(m, bit)
+            if hi - lo + 1 >= 5:
+                return [LINE_CELLS[lid][b] for b in range(lo, hi + 1)]
+        return []
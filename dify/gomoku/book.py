@@ -0,0 +1,93 @@
+"""
+开局库: 按规范哈希(折叠 8 种对称)排序的定长记录文件，用 mmap 打开后二分查找
+文件只读且由操作系统页缓存共享，多个对局进程同时使用也不会各自把整个库读进内存
+"""
+import mmap
+import os
+import struct
+
+from .board import SYMMETRIES, SYMMETRY_INVERSE
+
+BOOK_VERSION = 1
+BOOK_MAGIC = b"GMKB" + bytes([BOOK_VERSION])
+# 文件头: 魔数、库中局面的最多棋子数、记录数；记录: 规范哈希、规范坐标下的着法、权重(生成时的搜索深度)
+BOOK_HEADER = struct.Struct("<5sB2xI")
+BOOK_RECORD = struct.Struct("<QHH")
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gobang_book.bin")
+
+
+class OpeningBook:
+    """只读开局库，probe(board) 返回库中的着法(idx)，局面不在库中时返回 None"""
+
+    def __init__(self, path=BOOK_FILE):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.max_stones, self.size = BOOK_HEADER.unpack_from(self.data, 0)
+        if magic != BOOK_MAGIC or len(self.data) != BOOK_HEADER.size + self.size * BOOK_RECORD.size:
+            self.data.close()
+            raise ValueError(f"开局库文件格式不正确: {path}")
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        self.data.close()
+
+    def lookup(self, key):
+        """按规范哈希二分查找，返回 (规范坐标下的着法, 权重)，找不到时返回 None"""
+        data = self.data
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = BOOK_HEADER.size + mid * BOOK_RECORD.size
+            mid_key = struct.unpack_from("<Q", data, offset)[0]
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                _, move, weight = BOOK_RECORD.unpack_from(data, offset)
+                return move, weight
+        return None
+
+    def probe(self, board):
+        if board.count > self.max_stones:
+            return None
+        key, sym = board.canonical_hash()
+        entry = self.lookup(key)
+        if entry is None:
+            return None
+        # 库中的着法是规范局面下的坐标，用逆变换换回当前局面
+        idx = SYMMETRY_INVERSE[sym][entry[0]]
+        return idx if board.cells[idx] == 0 else None
+
+    def entries(self):
+        """遍历所有记录 (规范哈希, 着法, 权重)，用于合并新旧开局库"""
+        for i in range(self.size):
+            yield BOOK_RECORD.unpack_from(self.data, BOOK_HEADER.size + i * BOOK_RECORD.size)
+
+
+def open_book(path=BOOK_FILE):
+    # 开局库是离线生成的，文件不存在或损坏时不使用开局库
+    try:
+        return OpeningBook(path)
+    except (OSError, ValueError):
+        return None
+
+
+def book_entry(board, move):
+    """把当前局面下的着法换算成开局库记录的 (规范哈希, 规范坐标下的着法)"""
+    key, sym = board.canonical_hash()
+    return key, SYMMETRIES[sym][move]
+
+
+def write_book(path, entries, max_stones):
+    """entries 为 {规范哈希: (着法, 权重)}，排序后写入；先写临时文件再替换，正在读旧库的进程不受影响"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(BOOK_HEADER.pack(BOOK_MAGIC, max_stones, len(entries)))
+        for key in sorted(entries):
+            move, weight = entries[key]
+            f.write(BOOK_RECORD.pack(key, move, weight))
+    os.replace(tmp_path, path)
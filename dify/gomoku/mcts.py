@@ -0,0 +1,231 @@
+"""
+蒙特卡洛树搜索(UCT): 选择、扩展、按棋形启发的快速模拟、回传，随时可以停止并返回访问次数最多的着法
+搜索树在相邻两步之间保留，对手走子后从旧树中取出对应的子树继续搜索
+workers 大于 1 时其余进程各自建树搜索同一局面(根并行)，最后按根着法合并访问次数
+"""
+import math
+import random
+import time
+
+from .board import BOARD_SIZE
+from .state import GameState
+
+UCT_EXPLORATION = 0.7  # UCT 公式中探索项的系数
+MCTS_WIDTH = 10  # 每个节点只展开攻防分最高的这么多个着法
+PLAYOUT_DEPTH = 4  # 模拟的最多手数，之后用静态评估估计胜率
+PLAYOUT_SAMPLE = 4  # 模拟时每步随机取这么多个候选，走其中攻防分最高的
+EVAL_SCALE = 1000.0  # 双方棋形分之差除以它后经 sigmoid 换算成黑方胜率
+
+# 根并行: 工作进程中的全局对象
+_worker_stop = None
+_worker_search = None
+
+
+def _init_mcts_worker(stop):
+    global _worker_stop
+    _worker_stop = stop
+
+
+def _search_root(move_history, player, time_limit, node_limit, seed):
+    """在工作进程中搜索一个局面，返回 ({根着法: (访问次数, 胜分)}, 模拟次数)"""
+    global _worker_search
+    if _worker_search is None:
+        _worker_search = MonteCarloSearch(seed=seed)
+    search = _worker_search
+    board = GameState.from_history(move_history).bitboard
+    search.run(board, move_history, player, time_limit, node_limit, _worker_stop)
+    return {child.move: (child.visits, child.wins) for child in search.root.children}, search.playouts
+
+
+class Node:
+    """搜索树节点: player 走了 move 之后的局面；wins 为 player 视角的累计得分(胜 1、和 0.5)"""
+    __slots__ = ("move", "player", "parent", "children", "untried", "visits", "wins", "winner")
+
+    def __init__(self, move, player, parent=None, winner=0):
+        self.move = move
+        self.player = player
+        self.parent = parent
+        self.children = []
+        self.untried = None  # 尚未展开的着法，第一次访问时按攻防分生成
+        self.visits = 0
+        self.wins = 0.0
+        self.winner = winner  # 这步成五时为 player，之后不再展开
+
+    def select_child(self, exploration):
+        log_visits = math.log(self.visits)
+        return max(self.children,
+                   key=lambda child: child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits))
+
+
+class MonteCarloSearch:
+    """
+    UCT 搜索，run() 在时间或模拟次数用完、或 stop_event 被设置时返回访问次数最多的根着法(idx)
+    同一对象连续用于一局棋的各步时会复用搜索树
+    """
+
+    def __init__(self, workers=1, exploration=UCT_EXPLORATION, width=MCTS_WIDTH, playout_depth=PLAYOUT_DEPTH,
+                 seed=None):
+        self.workers = workers
+        self.exploration = exploration
+        self.width = width
+        self.playout_depth = playout_depth
+        self.rng = random.Random(seed)
+        self.root = None
+        self.root_history = []
+        self.playouts = 0  # 本步的模拟次数(含其他进程)
+        self.depth = 0  # 主变例(每层访问最多的子节点)的长度
+        self.reused = 0  # 本步开始时从上一步继承的根节点访问次数
+        self.pool = None
+        self.stop = None
+
+    def close(self):
+        if self.pool is not None:
+            self.stop.set()
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    def _reuse_tree(self, move_history, player):
+        # 新局面是旧根局面之后又走了几步时，沿这几步在旧树中向下找，找到就把该子树作为新根
+        node = None
+        known = len(self.root_history)
+        if self.root is not None and list(move_history[:known]) == self.root_history:
+            node = self.root
+            for row, col, _ in move_history[known:]:
+                idx = row * BOARD_SIZE + col
+                node = next((child for child in node.children if child.move == idx), None)
+                if node is None:
+                    break
+        if node is None or node.winner:
+            node = Node(None, 3 - player)
+        node.parent = None
+        self.root = node
+        self.root_history = list(move_history)
+
+    def expand_moves(self, board, player):
+        # 能成五只走成五；对方能成五只考虑挡；否则取攻防分最高的几个点
+        wins = board.five_cells[player]
+        if wins:
+            return [min(wins)]
+        threats = board.five_cells[3 - player]
+        if threats:
+            return sorted(threats)
+        moves = sorted(board.candidate_moves(), key=lambda idx: board.move_priority(idx, player), reverse=True)
+        return moves[:self.width]
+
+    def playout(self, board, player, placed):
+        """从当前局面由 player 先走模拟若干手，返回黑方的得分(0~1)"""
+        rng = self.rng
+        for _ in range(self.playout_depth):
+            if board.is_full():
+                return 0.5
+            if board.five_cells[player]:
+                return 1.0 if player == 1 else 0.0
+            threats = board.five_cells[3 - player]
+            if threats:
+                idx = min(threats)
+            else:
+                cells = list(board.candidates)
+                sample = rng.sample(cells, min(PLAYOUT_SAMPLE, len(cells)))
+                idx = max(sample, key=lambda idx: board.move_priority(idx, player))
+            board.place(*divmod(idx, BOARD_SIZE), player)
+            placed.append(idx)
+            player = 3 - player
+        # 到达模拟深度仍未分出胜负，用双方棋形分之差估计
+        diff = (board.scores[1] - board.scores[2]) / EVAL_SCALE
+        return 1.0 / (1.0 + math.exp(-max(min(diff, 50.0), -50.0)))
+
+    def iterate(self, board):
+        node = self.root
+        placed = []
+        try:
+            # 选择: 沿已完全展开的节点按 UCT 向下
+            while not node.winner and node.untried == [] and node.children:
+                node = node.select_child(self.exploration)
+                board.place(*divmod(node.move, BOARD_SIZE), node.player)
+                placed.append(node.move)
+
+            # 扩展: 展开一个新的子节点
+            if not node.winner and not board.is_full():
+                player = 3 - node.player
+                if node.untried is None:
+                    node.untried = self.expand_moves(board, player)
+                if node.untried:
+                    idx = node.untried.pop(0)
+                    winner = player if idx in board.five_cells[player] else 0
+                    board.place(*divmod(idx, BOARD_SIZE), player)
+                    placed.append(idx)
+                    child = Node(idx, player, node, winner)
+                    node.children.append(child)
+                    node = child
+
+            # 模拟
+            if node.winner:
+                result = 1.0 if node.winner == 1 else 0.0
+            else:
+                result = self.playout(board, 3 - node.player, placed)
+        finally:
+            for idx in reversed(placed):
+                board.remove(*divmod(idx, BOARD_SIZE))
+
+        # 回传
+        while node is not None:
+            node.visits += 1
+            node.wins += result if node.player == 1 else 1.0 - result
+            node = node.parent
+        self.playouts += 1
+
+    def run(self, board, move_history, player, time_limit=None, node_limit=None, stop_event=None):
+        """在本进程中搜索，time_limit 和 node_limit(模拟次数)至少要有一个，返回访问次数最多的根着法"""
+        self._reuse_tree(move_history, player)
+        self.reused = self.root.visits
+        self.playouts = 0
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        while True:
+            self.iterate(board)
+            if node_limit is not None and self.playouts >= node_limit:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if stop_event is not None and stop_event.is_set():
+                break
+        return self.best_move()
+
+    def best_move(self, extra=None):
+        # 按访问次数选，extra 为其他进程的 {着法: (访问次数, 胜分)}
+        visits = {child.move: child.visits for child in self.root.children}
+        for move, (count, _) in (extra or {}).items():
+            visits[move] = visits.get(move, 0) + count
+        node, self.depth = self.root, 0
+        while node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            self.depth += 1
+        return max(visits, key=lambda move: (visits[move], -move))
+
+    def search(self, board, move_history, player, time_limit=None, node_limit=None, stop_event=None):
+        """workers 大于 1 时把同一局面同时交给其他进程搜索，合并各棵树的根着法访问次数"""
+        if self.workers <= 1:
+            return self.run(board, move_history, player, time_limit, node_limit, stop_event)
+        if self.pool is None:
+            # multiprocessing 导入较慢，只在真正使用多进程时才导入
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            self.stop = multiprocessing.Event()
+            self.pool = ProcessPoolExecutor(self.workers - 1, initializer=_init_mcts_worker, initargs=(self.stop,))
+        self.stop.clear()
+        share = None if node_limit is None else max(1, node_limit // self.workers)
+        history = list(move_history)
+        futures = [self.pool.submit(_search_root, history, player, time_limit, share, self.rng.getrandbits(32))
+                   for _ in range(self.workers - 1)]
+        self.run(board, move_history, player, time_limit, share, stop_event)
+        if stop_event is not None and stop_event.is_set():
+            self.stop.set()
+        extra = {}
+        playouts = self.playouts
+        for future in futures:
+            visits, count = future.result()
+            playouts += count
+            for move, (n, wins) in visits.items():
+                total = extra.get(move, (0, 0.0))
+                extra[move] = (total[0] + n, total[1] + wins)
+        self.playouts = playouts
+        return self.best_move(extra)
@@ -0,0 +1,126 @@
+"""多进程根节点并行搜索"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from .board import BOARD_SIZE
+from .search import (HARD_TIME_LIMIT, MAX_SEARCH_DEPTH, WIN_SCORE, MinimaxSearch, SearchTimeout,
+                     TranspositionTable)
+from .state import GameState
+
+# 并行搜索: 工作进程中的全局对象，由进程池的 initializer 设置
+_worker_alpha = None
+_worker_stop = None
+_worker_tts = {}
+WORKER_TT_MB = 64
+
+
+def _init_search_worker(alpha, stop):
+    global _worker_alpha, _worker_stop
+    _worker_alpha = alpha
+    _worker_stop = stop
+
+
+def _search_root_chunk(move_history, player, depth, moves):
+    """
+    在工作进程中按给定深度搜索分到的根着法，返回 ({idx: (分值, 是否精确)}, 节点数)
+    分值不超过搜索时的 alpha 的着法没有被完整搜索，分值只是上界，不精确
+    """
+    state = GameState.from_history(move_history)
+    board = state.bitboard
+    # 每个进程按执棋方各保留一张置换表，同一进程处理的后续深度和后续回合都能复用
+    tt = _worker_tts.get(player)
+    if tt is None:
+        tt = _worker_tts[player] = TranspositionTable(WORKER_TT_MB)
+    search = MinimaxSearch(board, tt, player, time_limit=None, stop_event=_worker_stop)
+    scores = {}
+    for idx in moves:
+        r, c = divmod(idx, BOARD_SIZE)
+        # 其他进程已经找到的最好分值作为 alpha，明显更差的着法很快就会被剪掉
+        alpha = _worker_alpha.value
+        board.place(r, c, player)
+        try:
+            score = search.minimax(depth - 1, 1, alpha, float('inf'), False)
+        except SearchTimeout:
+            break
+        finally:
+            board.remove(r, c)
+        scores[idx] = (score, score > alpha)
+        if score > alpha:
+            with _worker_alpha.get_lock():
+                if score > _worker_alpha.value:
+                    _worker_alpha.value = score
+    return scores, search.nodes
+
+
+class ParallelSearch:
+    """
+    根节点并行搜索: 每一层把根着法轮流分给进程池中的工作进程，进程之间通过共享内存中的 alpha 互相剪枝
+    主进程负责迭代加深和计时，预算用完时通知工作进程停止，并返回上一层完成时的最佳着法
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.alpha = multiprocessing.Value('d', -float('inf'))
+        self.stop = multiprocessing.Event()
+        self.pool = None
+        self.depth = 0
+        self.nodes = 0
+
+    def _ensure_pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_search_worker,
+                                            initargs=(self.alpha, self.stop))
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.stop.set()
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    def search(self, move_history, player, time_limit=HARD_TIME_LIMIT, depth=None, stop_event=None):
+        """迭代加深到 depth 层(或直到用完 time_limit 秒)，返回最佳着法(idx)"""
+        pool = self._ensure_pool()
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        board = GameState.from_history(move_history).bitboard
+        moves = MinimaxSearch(board, TranspositionTable(1), player).order_moves(player, 0, None)
+        best_move = moves[0]
+        self.depth = 0
+        self.nodes = 0
+
+        for d in range(1, (depth or MAX_SEARCH_DEPTH) + 1):
+            self.alpha.value = -float('inf')
+            self.stop.clear()
+            chunks = [moves[i::self.workers] for i in range(min(self.workers, len(moves)))]
+            pending = {pool.submit(_search_root_chunk, move_history, player, d, chunk) for chunk in chunks}
+            finished = []
+            while pending:
+                timeout = 0.05 if deadline is None else min(0.05, max(deadline - time.perf_counter(), 0))
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                finished.extend(done)
+                expired = deadline is not None and time.perf_counter() >= deadline
+                if pending and (expired or (stop_event is not None and stop_event.is_set())):
+                    # 通知工作进程尽快停止，这一层的结果不完整，丢弃
+                    self.stop.set()
+                    wait(pending)
+                    return best_move
+
+            scores = {}
+            for future in finished:
+                chunk_scores, nodes = future.result()
+                scores.update(chunk_scores)
+                self.nodes += nodes
+            if len(scores) < len(moves):
+                break
+            # 只在精确分值中选；上界可能与最佳分值相等，但着法实际不会更好
+            # 设置了共享 alpha 的着法一定是精确的，所以至少有一个
+            best_move = max((idx for idx in moves if scores[idx][1]), key=lambda idx: scores[idx][0])
+            self.depth = d
+            # 下一层先按精确分值从高到低搜，只有上界的着法排在后面，并让它们分散到不同进程
+            moves.sort(key=lambda idx: (not scores[idx][1], -scores[idx][0]))
+            if abs(scores[best_move][0]) == WIN_SCORE:
+                break
+
+        return best_move
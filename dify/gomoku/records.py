@@ -0,0 +1,76 @@
+"""
+对局记录: 每手棋一个字节(格子编号 row * 15 + col，黑先交替)，加上定长的记录头
+对局日志是只追加的文件: 文件头之后一局接一局地写，读取时用 mmap 顺序扫描，不需要把整个文件读进内存
+"""
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+
+from .board import BOARD_SIZE
+
+LOG_VERSION = 1
+LOG_MAGIC = b"GMKR" + bytes([LOG_VERSION])
+# 记录头: 结束时间(Unix 秒)、手数、结果、黑方和白方的类型
+RECORD_HEADER = struct.Struct("<IBBBB")
+RESULT_DRAW = 0  # 1、2 为胜方，和棋与未下完分开记录
+RESULT_UNFINISHED = 3
+PLAYER_TYPES = ("human", "easy", "medium", "hard", "other", "mcts")  # 新类型追加在末尾，旧日志的编码不变
+
+GameRecord = namedtuple("GameRecord", "timestamp result black white moves")
+
+
+def player_code(name):
+    return PLAYER_TYPES.index(name) if name in PLAYER_TYPES else PLAYER_TYPES.index("other")
+
+
+def encode_game(move_history, result, black="human", white="human", timestamp=None):
+    """把着法记录 [(row, col, player), ...] 编码成一条记录"""
+    if len(move_history) > BOARD_SIZE * BOARD_SIZE:
+        raise ValueError("着法数超过棋盘格数")
+    header = RECORD_HEADER.pack(int(time.time() if timestamp is None else timestamp), len(move_history), result,
+                                player_code(black), player_code(white))
+    return header + bytes(row * BOARD_SIZE + col for row, col, _ in move_history)
+
+
+def game_result(game_state):
+    if not game_state.game_over:
+        return RESULT_UNFINISHED
+    return game_state.winner or RESULT_DRAW
+
+
+def history_of(record):
+    """把记录中的着法还原成 [(row, col, player), ...]"""
+    return [(idx // BOARD_SIZE, idx % BOARD_SIZE, 1 if i % 2 == 0 else 2) for i, idx in enumerate(record.moves)]
+
+
+def append_game(path, record_bytes):
+    """追加一局到对局日志，文件不存在时先写文件头；整条记录一次写入"""
+    with open(path, "ab") as f:
+        if f.tell() == 0:
+            f.write(LOG_MAGIC)
+        f.write(record_bytes)
+
+
+def iter_games(path):
+    """
+    顺序读出对局日志中的每一局(GameRecord)，用 mmap 按需读取
+    文件末尾不完整的记录(写入时进程中断)会被忽略
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= len(LOG_MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(LOG_MAGIC)] != LOG_MAGIC:
+                raise ValueError(f"对局日志格式不正确: {path}")
+            offset = len(LOG_MAGIC)
+            end = len(data)
+            while offset + RECORD_HEADER.size <= end:
+                timestamp, length, result, black, white = RECORD_HEADER.unpack_from(data, offset)
+                offset += RECORD_HEADER.size
+                if offset + length > end:
+                    break
+                yield GameRecord(timestamp, result, PLAYER_TYPES[black], PLAYER_TYPES[white],
+                                 data[offset:offset + length])
+                offset += length
@@ -0,0 +1,251 @@
+"""置换表和迭代加深的 alpha-beta 搜索"""
+import time
+
+from .board import BOARD_SIZE, SHAPE_FIVE, SHAPE_SCORES
+
+# 置换表条目类型: 精确值 / 下界(发生 beta 剪枝) / 上界(没有超过 alpha)
+TT_EXACT = 0
+TT_LOWER = 1
+TT_UPPER = 2
+# 单个条目的大致内存占用(槽位指针 + 元组 + 其中的整数对象)，用于把内存上限换算成槽位数
+TT_ENTRY_BYTES = 160
+
+class TranspositionTable:
+    """按 Zobrist 哈希索引的定长置换表，记录搜索深度、边界类型、分值和最佳着法"""
+
+    def __init__(self, max_mb=64):
+        # 槽位数取不超过内存上限的 2 的幂，便于用掩码取索引
+        slots = max(1, max_mb * 1024 * 1024 // TT_ENTRY_BYTES)
+        self.size = 1 << (slots.bit_length() - 1)
+        self.mask = self.size - 1
+        self.table = [None] * self.size
+        self.generation = 0
+
+    def new_search(self):
+        # 每次根搜索开始时调用，旧搜索留下的条目会被优先替换
+        self.generation += 1
+
+    def clear(self):
+        self.table = [None] * self.size
+
+    def probe(self, key):
+        entry = self.table[key & self.mask]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, flag, score, best_move):
+        idx = key & self.mask
+        old = self.table[idx]
+        # 替换策略: 空槽、同一局面、上一轮搜索的旧条目直接覆盖，否则只让更深的结果替换
+        if old is None or old[0] == key or old[5] != self.generation or depth >= old[1]:
+            self.table[idx] = (key, depth, flag, score, best_move, self.generation)
+
+
+
+# 搜索参数
+WIN_SCORE = 100000
+HARD_TIME_LIMIT = 1.0  # 困难难度每步思考时间(秒)
+MAX_SEARCH_DEPTH = 12
+TIME_CHECK_INTERVAL = 16  # 每搜索这么多个节点检查一次时间，每个节点要展开和查表，检查太稀会明显超出短预算
+
+
+class SearchTimeout(Exception):
+    """超出时间或节点预算时抛出，用于从递归中整体退出"""
+
+
+class MinimaxSearch:
+    """
+    迭代加深的 alpha-beta 搜索: 深度 1、2、3...逐层加深，直到用完时间或节点预算
+    每层的结果(置换表中的主变例、杀手着法、历史表)用于下一层的着法排序
+    """
+
+    def __init__(self, board, tt, player=2, time_limit=HARD_TIME_LIMIT, node_limit=None,
+                 max_depth=MAX_SEARCH_DEPTH, stop_event=None):
+        self.board = board
+        self.tt = tt
+        self.player = player  # 极大方，评估分值以它为正
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.stop_event = stop_event  # 外部设置后尽快停止，用于打断后台预想
+        self.max_depth = max_depth
+        self.deadline = None
+        self.nodes = 0
+        self.depth = 0  # 已完整搜索完成的深度
+        # 统计计数，汇总到 SearchStats 中: 叶子评估、按层剪枝、置换表查询/命中、展开的节点和实际搜索的子节点
+        self.leaf_evals = 0
+        self.cutoffs = [0] * (max_depth + 1)
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.expanded = 0
+        self.children = 0
+        self.best_move = None
+        self.best_score = -float('inf')
+        # 每层两个杀手着法；历史表按玩家记录曾经引发剪枝的着法
+        self.killers = [[None, None] for _ in range(max_depth + 1)]
+        self.history = [None, [0] * (BOARD_SIZE * BOARD_SIZE), [0] * (BOARD_SIZE * BOARD_SIZE)]
+
+    def evaluate(self):
+        # 位棋盘在落子/提子时已增量更新双方棋形分，这里只需 O(1) 读取
+        scores = self.board.scores
+        own, opp = scores[self.player], scores[3 - self.player]
+        if own >= SHAPE_SCORES[SHAPE_FIVE]:
+            return WIN_SCORE
+        if opp >= SHAPE_SCORES[SHAPE_FIVE]:
+            return -WIN_SCORE
+        return own - opp * 1.2  # 更重视防守
+
+    def order_moves(self, player, ply, tt_move):
+        board = self.board
+        history = self.history[player]
+        # 按查表得到的攻防分加历史分排序，再把置换表着法和杀手着法提到最前面
+        moves = sorted(board.candidate_moves(), key=lambda idx: -board.move_priority(idx, player) - history[idx])
+        front = [tt_move] + self.killers[ply]
+        for idx in reversed(front):
+            if idx is not None and idx in moves:
+                moves.remove(idx)
+                moves.insert(0, idx)
+        return moves
+
+    def check_time(self):
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout
+
+    def minimax(self, depth, ply, alpha, beta, is_maximizing):
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0:
+            self.check_time()
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchTimeout
+
+        board = self.board
+        tt = self.tt
+
+        # 查询置换表: 深度足够时直接使用或收紧窗口，否则只取最佳着法用于排序
+        key = board.hash
+        entry = tt.probe(key)
+        self.tt_probes += 1
+        tt_move = None
+        if entry is not None:
+            self.tt_hits += 1
+            if entry[1] >= depth:
+                flag, score = entry[2], entry[3]
+                if flag == TT_EXACT:
+                    return score
+                if flag == TT_LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score
+            tt_move = entry[4]
+
+        # 终止条件: 深度用完、棋盘已满或已有一方成五
+        score = self.evaluate()
+        if depth == 0 or board.is_full() or abs(score) == WIN_SCORE:
+            self.leaf_evals += 1
+            tt.store(key, depth, TT_EXACT, score, None)
+            return score
+
+        alpha_orig, beta_orig = alpha, beta
+        player = self.player if is_maximizing else 3 - self.player
+        moves = self.order_moves(player, ply, tt_move)
+        self.expanded += 1
+
+        best_move = None
+        best_eval = -float('inf') if is_maximizing else float('inf')
+        for idx in moves:
+            self.children += 1
+            r, c = divmod(idx, BOARD_SIZE)
+            board.place(r, c, player)
+            try:
+                eval = self.minimax(depth - 1, ply + 1, alpha, beta, not is_maximizing)
+            finally:
+                board.remove(r, c)
+            if is_maximizing:
+                if eval > best_eval:
+                    best_eval = eval
+                    best_move = idx
+                alpha = max(alpha, eval)
+            else:
+                if eval < best_eval:
+                    best_eval = eval
+                    best_move = idx
+                beta = min(beta, eval)
+            if beta <= alpha:
+                # 引发剪枝的着法记为本层杀手着法，并累加历史分
+                self.cutoffs[ply] += 1
+                killers = self.killers[ply]
+                if idx != killers[0]:
+                    killers[1] = killers[0]
+                    killers[0] = idx
+                self.history[player][idx] += depth * depth
+                break
+
+        if best_eval <= alpha_orig:
+            flag = TT_UPPER
+        elif best_eval >= beta_orig:
+            flag = TT_LOWER
+        else:
+            flag = TT_EXACT
+        tt.store(key, depth, flag, best_eval, best_move)
+        return best_eval
+
+    def search_root(self, depth, moves):
+        board = self.board
+        best_score = -float('inf')
+        best_move = None
+        scores = {}
+        self.expanded += 1
+        for idx in moves:
+            # 根着法之间也检查一次，子树很小时不必等满一个检查间隔
+            self.check_time()
+            self.children += 1
+            r, c = divmod(idx, BOARD_SIZE)
+            board.place(r, c, self.player)
+            try:
+                # 以当前最好分值作为 alpha，不可能更好的根着法会被提前剪掉
+                score = self.minimax(depth - 1, 1, best_score, float('inf'), False)
+            finally:
+                board.remove(r, c)
+            scores[idx] = score
+            if score > best_score:
+                best_score = score
+                best_move = idx
+                # 本层第一个着法就是上一层的最佳着法，之后分值更高的着法已被本层证实更好，中途超时也可直接使用
+                self.best_move, self.best_score = best_move, best_score
+        return best_move, best_score, scores
+
+    def run(self):
+        """迭代加深直到预算用完，返回目前为止的最佳着法(idx)"""
+        board = self.board
+        tt = self.tt
+        tt.new_search()
+        if self.time_limit is not None:
+            self.deadline = time.perf_counter() + self.time_limit
+
+        moves = self.order_moves(self.player, 0, None)
+        entry = tt.probe(board.hash)
+        if entry is not None and entry[4] in moves:
+            moves.remove(entry[4])
+            moves.insert(0, entry[4])
+        self.best_move = moves[0]
+
+        for depth in range(1, self.max_depth + 1):
+            try:
+                best_move, best_score, scores = self.search_root(depth, moves)
+            except SearchTimeout:
+                break
+            self.depth = depth
+            self.best_move, self.best_score = best_move, best_score
+            tt.store(board.hash, depth, TT_EXACT, best_score, best_move)
+            # 上一层的主变例着法排在最前，其余按本层分值排序
+            moves.sort(key=lambda idx: -scores[idx])
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+            if abs(best_score) == WIN_SCORE:
+                break
+
+        return self.best_move
@@ -0,0 +1,99 @@
+"""
+多进程共享的置换表: 定长槽位数组放在 multiprocessing.shared_memory 中，同一台机器上的所有工作进程读写同一张表
+不加锁，写入时把键与数据异或后存放(无锁哈希)，读到被其他进程同时改写的半条记录时校验失败，当作未命中
+"""
+import copy
+import struct
+from multiprocessing import shared_memory
+
+# 表头: 槽位数、当前搜索代数(所有进程共用)
+HEADER = struct.Struct("<QQ")
+# 槽位: 校验键(键 ^ 数据的两个 8 字节)、16 字节数据
+SLOT = struct.Struct("<Q16s")
+# 数据: 分值、最佳着法、深度、边界类型、代数
+DATA = struct.Struct("<dHBBH2x")
+HALVES = struct.Struct("<QQ")
+NO_MOVE = 0xFFFF
+# 分值以执棋方为正，同一局面两方的条目不能混用，键按执棋方异或不同的常数
+PLAYER_SALT = (0, 0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F)
+
+
+class SharedTranspositionTable:
+    """
+    与 TranspositionTable 接口相同(probe/store/new_search/clear)，条目格式也相同
+    name 为 None 时创建共享内存，否则按名字连接已有的表；创建方负责在最后调用 unlink()
+    搜索时使用 for_player(player) 返回的视图，两方的条目互不干扰
+    """
+
+    def __init__(self, max_mb=64, name=None):
+        if name is None:
+            slots = max(1, (max_mb * 1024 * 1024 - HEADER.size) // SLOT.size)
+            size = 1 << (slots.bit_length() - 1)
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER.size + size * SLOT.size)
+            HEADER.pack_into(self.shm.buf, 0, size, 0)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            size = HEADER.unpack_from(self.shm.buf, 0)[0]
+            self.owner = False
+        self.size = size
+        self.mask = size - 1
+        self.salt = 0
+        self.generation = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def for_player(self, player):
+        # 视图与原表共用同一块共享内存，只是键的异或常数不同
+        view = copy.copy(self)
+        view.salt = PLAYER_SALT[player]
+        view.owner = False
+        return view
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        if self.owner:
+            self.shm.unlink()
+
+    def new_search(self):
+        # 代数记在表头中，任一进程开始新搜索后，所有进程的旧条目都会被优先替换
+        buf = self.shm.buf
+        self.generation = (HEADER.unpack_from(buf, 0)[1] + 1) & 0xFFFF
+        HEADER.pack_into(buf, 0, self.size, self.generation)
+
+    def clear(self):
+        buf = self.shm.buf
+        buf[HEADER.size:HEADER.size + self.size * SLOT.size] = bytes(self.size * SLOT.size)
+
+    def _read(self, offset):
+        # 返回 (键, 数据)；空槽或校验失败的槽返回 (None, None)
+        check, data = SLOT.unpack_from(self.shm.buf, offset)
+        low, high = HALVES.unpack(data)
+        if check == 0 and low == 0 and high == 0:
+            return None, None
+        return check ^ low ^ high, data
+
+    def probe(self, key):
+        key ^= self.salt
+        stored, data = self._read(HEADER.size + (key & self.mask) * SLOT.size)
+        if stored != key:
+            return None
+        score, move, depth, flag, generation = DATA.unpack(data)
+        return key ^ self.salt, depth, flag, score, None if move == NO_MOVE else move, generation
+
+    def store(self, key, depth, flag, score, best_move):
+        key ^= self.salt
+        offset = HEADER.size + (key & self.mask) * SLOT.size
+        stored, data = self._read(offset)
+        # 替换策略与进程内的置换表相同
+        if stored is not None and stored != key:
+            _, _, old_depth, _, old_generation = DATA.unpack(data)
+            if old_generation == self.generation and depth < old_depth:
+                return
+        data = DATA.pack(score, NO_MOVE if best_move is None else best_move, min(depth, 0xFF), flag, self.generation)
+        low, high = HALVES.unpack(data)
+        SLOT.pack_into(self.shm.buf, offset, key ^ low ^ high, data)
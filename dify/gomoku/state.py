@@ -0,0 +1,86 @@
+"""对局状态: 供界面使用的二维棋盘和着法记录，与位棋盘保持同步"""
+from .board import BOARD_SIZE, BitBoard
+
+
+# 游戏状态
+class GameState:
+    def __init__(self):
+        self.board = [[0 for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+        self.bitboard = BitBoard()  # AI 和判胜使用的位棋盘，与 board 保持同步
+        self.current_player = 1  # 1 for black, 2 for white
+        self.game_over = False
+        self.winner = 0
+        self.winning_line = []
+        self.mode = "menu"  # menu, pvp, pve
+        self.ai_difficulty = "medium"  # easy, medium, hard
+        self.sound_on = True
+        self.move_history = []
+        self.last_move = None
+
+    @classmethod
+    def from_history(cls, move_history):
+        # 按着法记录重建一个独立的局面，供后台线程和工作进程搜索使用
+        state = cls()
+        state.sound_on = False
+        for row, col, _ in move_history:
+            state.make_move(row, col)
+        return state
+
+    def reset(self):
+        self.board = [[0 for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+        self.bitboard = BitBoard()
+        self.current_player = 1
+        self.game_over = False
+        self.winner = 0
+        self.winning_line = []
+        self.move_history = []
+        self.last_move = None
+
+    def make_move(self, row, col):
+        if self.game_over or self.board[row][col] != 0:
+            return False
+
+        self.board[row][col] = self.current_player
+        self.bitboard.place(row, col, self.current_player)
+        self.move_history.append((row, col, self.current_player))
+        self.last_move = (row, col)
+
+        if self.check_win(row, col):
+            self.game_over = True
+            self.winner = self.current_player
+        elif self.is_board_full():
+            self.game_over = True
+
+        self.current_player = 3 - self.current_player  # Switch player (1->2, 2->1)
+
+        return True
+
+    def undo_move(self):
+        if len(self.move_history) == 0:
+            return False
+
+        row, col, player = self.move_history.pop()
+        self.board[row][col] = 0
+        self.bitboard.remove(row, col)
+        self.current_player = player
+        self.game_over = False
+        self.winner = 0
+        self.winning_line = []
+
+        if len(self.move_history) > 0:
+            self.last_move = (self.move_history[-1][0], self.move_history[-1][1])
+        else:
+            self.last_move = None
+
+        return True
+
+    def check_win(self, row, col):
+        player = self.bitboard.get(row, col)
+        line = self.bitboard.five_line(row, col, player)
+        if line:
+            self.winning_line = line
+            return True
+        return False
+
+    def is_board_full(self):
+        return self.bitboard.is_full()
@@ -0,0 +1,94 @@
+"""每步棋的搜索统计，用于调参和发现耗时退化"""
+import json
+import time
+from contextlib import contextmanager
+
+
+class SearchStats:
+    """
+    一步棋的统计: 着法来源、各阶段耗时、节点数、叶子评估数、按层的剪枝次数、置换表命中率和有效分支因子
+    AI.make_move 之后可以从 ai.last_stats 取得，也可以通过 AI 的 on_stats 回调逐步接收
+    """
+
+    def __init__(self, difficulty, player):
+        self.difficulty = difficulty
+        self.player = player
+        self.move = None
+        # 着法来源: win、block、book、vcf、defence、vct、search、score(中等难度的攻防分)、random(简单难度)
+        self.source = None
+        self.phases = {}  # 阶段名 -> 秒
+        self.depth = 0
+        self.nodes = 0  # 含威胁空间搜索的节点
+        self.threat_nodes = 0
+        self.leaf_evals = 0
+        self.cutoffs = []  # cutoffs[ply] = 该层发生 beta 剪枝的次数
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.expanded = 0  # 展开了子节点的内部节点数
+        self.children = 0  # 实际搜索的子节点数，剪枝后没有搜索的不算
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    @property
+    def elapsed(self):
+        return sum(self.phases.values())
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def branching_factor(self):
+        # 有效分支因子: 平均每个内部节点实际搜索了多少个子节点，越小说明着法排序越好
+        return self.children / self.expanded if self.expanded else 0.0
+
+    def add_search(self, search):
+        """累加一次 MinimaxSearch 的计数"""
+        self.depth = max(self.depth, search.depth)
+        self.nodes += search.nodes
+        self.leaf_evals += search.leaf_evals
+        self.tt_probes += search.tt_probes
+        self.tt_hits += search.tt_hits
+        self.expanded += search.expanded
+        self.children += search.children
+        if len(self.cutoffs) < len(search.cutoffs):
+            self.cutoffs.extend([0] * (len(search.cutoffs) - len(self.cutoffs)))
+        for ply, count in enumerate(search.cutoffs):
+            self.cutoffs[ply] += count
+
+    def as_dict(self):
+        cutoffs = list(self.cutoffs)
+        while cutoffs and cutoffs[-1] == 0:
+            cutoffs.pop()
+        return {
+            "difficulty": self.difficulty,
+            "player": self.player,
+            "move": self.move,
+            "source": self.source,
+            "elapsed": round(self.elapsed, 6),
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "depth": self.depth,
+            "nodes": self.nodes,
+            "threat_nodes": self.threat_nodes,
+            "leaf_evals": self.leaf_evals,
+            "cutoffs": cutoffs,
+            "tt_hit_rate": round(self.tt_hit_rate, 4),
+            "branching_factor": round(self.branching_factor, 2),
+        }
+
+    def __repr__(self):
+        return f"SearchStats({self.as_dict()})"
+
+
+def jsonl_hook(stream):
+    """返回一个 on_stats 回调，把每步的统计作为一行 JSON 写入 stream"""
+    def emit(stats):
+        stream.write(json.dumps(stats.as_dict(), ensure_ascii=False) + "\n")
+        stream.flush()
+    return emit
@@ -0,0 +1,215 @@
+"""威胁空间搜索: 连续冲四(VCF)和连续活三冲四(VCT)取胜，以及对对方威胁的防守"""
+import time
+
+from .board import (BOARD_SIZE, LINE_CELLS, SHAPE_NONE, SHAPE_OPEN_TWO, SHAPE_THREE, SHAPE_OPEN_THREE, SHAPE_FOUR,
+                    SHAPE_SCORES)
+from .search import SearchTimeout
+
+# 威胁空间搜索参数: 深度按进攻方的着法数计
+VCF_DEPTH = 12
+VCT_DEPTH = 4
+THREAT_NODE_LIMIT = 3000
+THREAT_TIME_SHARE = 0.3  # 困难难度每步时间中留给威胁空间搜索的比例
+# 一条线上要再落一子形成某棋形，这条线原本至少要有的棋形
+PRECURSOR_SHAPES = {SHAPE_FOUR: SHAPE_THREE, SHAPE_OPEN_THREE: SHAPE_OPEN_TWO}
+DEFENCE_TRIALS = 20  # 寻找防守着法时最多尝试的候选数
+
+
+class ThreatSearch:
+    """
+    威胁空间搜索: 进攻方只走冲四(VCF)或冲四加活三(VCT)，防守方只考虑必须的应对
+    分支很少，可以在全宽搜索之前读出很深的连续进攻，结果按 (局面哈希, 进攻方, 类型, 剩余深度) 缓存
+    """
+
+    def __init__(self, board, node_limit=THREAT_NODE_LIMIT, time_limit=None, stop_event=None):
+        self.board = board
+        self.node_limit = node_limit
+        self.deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self.stop_event = stop_event
+        self.nodes = 0
+        self.cache = {}
+
+    def winning_cells(self, player):
+        return self.board.winning_cells(player)
+
+    def threat_moves(self, player, min_shape):
+        # 落下后至少在一个方向形成 min_shape 的空位，先按最强棋形、再按棋形总分排序
+        board = self.board
+        need = PRECURSOR_SHAPES.get(min_shape)
+        if need is None:
+            cells = board.candidates
+        else:
+            # 只看己方棋形已经够格的线上的空位，省去大部分查表
+            cells = set()
+            cell_values = board.cells
+            for lid, shape in enumerate(board.line_shapes[player]):
+                if shape >= need:
+                    for point in LINE_CELLS[lid]:
+                        if point is not None and cell_values[point[0] * BOARD_SIZE + point[1]] == 0:
+                            cells.add(point[0] * BOARD_SIZE + point[1])
+        scored = []
+        for idx in cells:
+            shapes = board.point_shapes(*divmod(idx, BOARD_SIZE), player)
+            best = max(shapes)
+            if best >= min_shape:
+                scored.append((-best, -sum(SHAPE_SCORES[shape] for shape in shapes), idx))
+        scored.sort()
+        return [idx for _, _, idx in scored]
+
+    def vcf(self, attacker, depth=VCF_DEPTH):
+        """返回 attacker 先走的连续冲四取胜序列(idx 列表)，找不到或超出预算时返回 None"""
+        try:
+            return self._vcf(attacker, depth)
+        except SearchTimeout:
+            return None
+
+    def vct(self, attacker, depth=VCT_DEPTH):
+        """返回 attacker 先走的冲四/活三取胜主线(idx 列表)，找不到或超出预算时返回 None"""
+        try:
+            return self._vct(attacker, depth)
+        except SearchTimeout:
+            return None
+
+    def find_defence(self, player, depth=VCT_DEPTH):
+        """
+        对手有 VCF/VCT 必胜时，返回能让它失效的着法
+        找不到能挡住全部 VCT 的着法时，只要对手有 VCF，退而返回至少能挡住 VCF 的着法
+        对手没有必胜、找不到防守或超出预算时返回 None
+        """
+        board = self.board
+        opponent = 3 - player
+        fallback = None
+        try:
+            threat = self._vct(opponent, depth)
+            if not threat:
+                return None
+            vcf_line = self._vcf(opponent, VCF_DEPTH) or []
+            # 先试对手进攻主线上的点，再按攻防分试其余候选
+            trials = []
+            for idx in threat[::2] + vcf_line[::2] + self.threat_moves(player, SHAPE_NONE):
+                if idx not in trials and board.cells[idx] == 0:
+                    trials.append(idx)
+            for idx in trials[:DEFENCE_TRIALS]:
+                r, c = divmod(idx, BOARD_SIZE)
+                board.place(r, c, player)
+                try:
+                    refuted = not self._vct(opponent, depth)
+                    if not refuted and vcf_line and fallback is None and not self._vcf(opponent, VCF_DEPTH):
+                        fallback = idx
+                finally:
+                    board.remove(r, c)
+                if refuted:
+                    return idx
+        except SearchTimeout:
+            pass
+        return fallback
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes > self.node_limit:
+            raise SearchTimeout
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout
+
+    def _vcf(self, attacker, depth):
+        wins = self.winning_cells(attacker)
+        if wins:
+            return [wins[0]]
+        if depth <= 0:
+            return None
+        key = (self.board.hash, attacker, "vcf", depth)
+        if key in self.cache:
+            return self.cache[key]
+        self._tick()
+
+        # 对方已经冲四时只能去挡，而且挡的这一手也必须是冲四
+        forced = self.winning_cells(3 - attacker)
+        result = None
+        if len(forced) <= 1:
+            for idx in self.threat_moves(attacker, SHAPE_FOUR):
+                if forced and idx != forced[0]:
+                    continue
+                result = self._after_four(idx, attacker, depth, self._vcf)
+                if result:
+                    break
+        self.cache[key] = result
+        return result
+
+    def _vct(self, attacker, depth):
+        wins = self.winning_cells(attacker)
+        if wins:
+            return [wins[0]]
+        if depth <= 0:
+            return None
+        key = (self.board.hash, attacker, "vct", depth)
+        if key in self.cache:
+            return self.cache[key]
+        self._tick()
+
+        forced = self.winning_cells(3 - attacker)
+        result = None
+        if len(forced) <= 1:
+            result = self._vcf(attacker, VCF_DEPTH)
+            if not result:
+                for idx in self.threat_moves(attacker, SHAPE_OPEN_THREE):
+                    if forced and idx != forced[0]:
+                        continue
+                    if max(self.board.point_shapes(*divmod(idx, BOARD_SIZE), attacker)) >= SHAPE_FOUR:
+                        result = self._after_four(idx, attacker, depth, self._vct)
+                    else:
+                        result = self._after_three(idx, attacker, depth)
+                    if result:
+                        break
+        self.cache[key] = result
+        return result
+
+    def _after_four(self, idx, attacker, depth, next_step):
+        # 冲四之后防守方只能挡在唯一的成五点上(两个成五点即活四，直接获胜)
+        board = self.board
+        r, c = divmod(idx, BOARD_SIZE)
+        board.place(r, c, attacker)
+        try:
+            if self.winning_cells(3 - attacker):
+                return None
+            blocks = self.winning_cells(attacker)
+            if len(blocks) >= 2:
+                return [idx]
+            if not blocks:
+                return None
+            br, bc = divmod(blocks[0], BOARD_SIZE)
+            board.place(br, bc, 3 - attacker)
+            try:
+                line = next_step(attacker, depth - 1)
+            finally:
+                board.remove(br, bc)
+            return [idx, blocks[0]] + line if line else None
+        finally:
+            board.remove(r, c)
+
+    def _after_three(self, idx, attacker, depth):
+        # 活三之后防守方可以挡在进攻方能冲四的点上，或者自己冲四反击；每种应对都要仍然必胜
+        board = self.board
+        defender = 3 - attacker
+        r, c = divmod(idx, BOARD_SIZE)
+        board.place(r, c, attacker)
+        try:
+            if self.winning_cells(defender):
+                return None
+            replies = sorted(set(self.threat_moves(attacker, SHAPE_FOUR)) | set(self.threat_moves(defender, SHAPE_FOUR)))
+            main_line = None
+            for reply in replies:
+                rr, rc = divmod(reply, BOARD_SIZE)
+                board.place(rr, rc, defender)
+                try:
+                    line = self._vct(attacker, depth - 1)
+                finally:
+                    board.remove(rr, rc)
+                if not line:
+                    return None
+                if main_line is None:
+                    main_line = [idx, reply] + line
+            return main_line
+        finally:
+            board.remove(r, c)
@@ -0,0 +1,54 @@
+"""可选的 NumPy 后端: 用整块数组运算一次算出全盘每个格子对双方的棋形分，供中等难度使用"""
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import as_strided
+except ImportError:  # 没有安装 numpy 时退回逐格查表
+    np = None
+
+from .board import BOARD_SIZE, DIRECTIONS, PATTERN_WINDOW, SHAPE_SCORES, pattern_table
+
+HAVE_NUMPY = np is not None
+# 9 格窗口以中心为准向两侧各伸出 4 格，棋盘四周补 4 圈"棋盘外"
+PAD = PATTERN_WINDOW // 2
+PADDED_SIZE = BOARD_SIZE + 2 * PAD
+OFF_BOARD = 3
+# DIGITS[player - 1][格子的值] = 该格在 player 视角下的三进制数位
+DIGITS = None if np is None else np.array([[0, 1, 2, 2], [0, 2, 1, 2]], dtype=np.int32)
+
+_arrays = None
+
+
+def _lookup_arrays():
+    # 查找表和棋形分值转成数组，第一次使用时创建
+    global _arrays
+    if _arrays is None:
+        _arrays = (np.frombuffer(pattern_table(), dtype=np.uint8),
+                   np.array(SHAPE_SCORES, dtype=np.int64),
+                   np.array([3 ** i for i in range(PATTERN_WINDOW)], dtype=np.int32))
+    return _arrays
+
+
+def board_array(board):
+    """位棋盘格子的 int8 视图(不复制)，随落子/提子自动更新"""
+    return np.frombuffer(board.cells, dtype=np.int8).reshape(BOARD_SIZE, BOARD_SIZE)
+
+
+def score_maps(board):
+    """
+    返回形状为 (2, 15, 15) 的数组，[player - 1][row, col] 为 player 落在该空位后四个方向棋形分之和
+    与 BitBoard.point_score 的结果相同；已有棋子的格子上的值没有意义
+    """
+    patterns, shape_scores, powers = _lookup_arrays()
+    padded = np.full((PADDED_SIZE, PADDED_SIZE), OFF_BOARD, dtype=np.int8)
+    padded[PAD:PAD + BOARD_SIZE, PAD:PAD + BOARD_SIZE] = board_array(board)
+    # 每格在双方视角下的三进制数位: 0 空, 1 己方, 2 对方或棋盘外
+    digits = DIGITS[:, padded]
+    s0, s1, s2 = digits.strides
+
+    codes = []
+    for dr, dc in DIRECTIONS:
+        # 步长技巧: 把每格沿该方向的 9 格窗口看成数组的最后一维(不复制)，与 3 的幂做点积即得窗口编码
+        start = digits[:, PAD - PAD * dr:, PAD - PAD * dc:]
+        windows = as_strided(start, (2, BOARD_SIZE, BOARD_SIZE, PATTERN_WINDOW), (s0, s1, s2, dr * s1 + dc * s2))
+        codes.append(windows @ powers)
+    return shape_scores[patterns[np.stack(codes)]].sum(axis=0)
@@ -0,0 +1,284 @@
+"""
+离线的行政区划 adcode 索引: 把城市名解析成 adcode 不再需要请求高德 /v3/config/district
+
+索引文件是按名称排序的定长记录表加一段名称字符串，用 mmap 打开后二分查找；
+同一前缀的名称在排序后连续存放，前缀查找就是在这段连续区间里取，相当于一棵压平的前缀树。
+每个地区除了全称，还收录去掉"市""区""县"等后缀的简称、拼音(安装了 pypinyin 时)和常用别称。
+索引中没有的名称由调用方查询接口后通过 remember() 写回旁边的追加文件，下次启动时一并加载。
+
+生成索引:
+    python adcode_index.py build --csv AMap_adcode_citycode.csv   # 高德官网下载的编码表(另存为 CSV)
+    python adcode_index.py build --api                            # 用 LBS_AMAP_API_KEY 从接口拉取全国区划
+"""
+import argparse
+import csv
+import mmap
+import os
+import struct
+import sys
+from typing import Iterable
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # 没有 pypinyin 时不收录拼音
+    lazy_pinyin = None
+
+INDEX_VERSION = 1
+INDEX_MAGIC = b"ADCX" + bytes([INDEX_VERSION])
+# 文件头: 魔数、记录数、名称区的起始偏移；记录: 名称在名称区中的偏移和字节数、级别、adcode
+INDEX_HEADER = struct.Struct("<5s3xII")
+INDEX_RECORD = struct.Struct("<IHBI")
+INDEX_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_FILE = os.path.join(INDEX_DIR, "adcode_index.bin")
+# 接口查到的结果追加在这里，每行 "名称\tadcode"
+OVERLAY_FILE = os.path.join(INDEX_DIR, "adcode_overlay.tsv")
+
+# 级别: 同名时省级优先于市级、市级优先于区县级
+LEVEL_PROVINCE = 0
+LEVEL_CITY = 1
+LEVEL_DISTRICT = 2
+
+# 生成简称时去掉的后缀，长的在前
+NAME_SUFFIXES = ("特别行政区", "维吾尔自治区", "壮族自治区", "回族自治区", "自治区", "自治州", "自治县", "地区",
+                 "省", "市", "区", "县", "盟", "旗")
+# 常用别称 -> 正式名称
+ALIASES = {
+    "帝都": "北京市", "京城": "北京市", "魔都": "上海市", "申城": "上海市", "羊城": "广州市", "花城": "广州市",
+    "鹏城": "深圳市", "蓉城": "成都市", "山城": "重庆市", "雾都": "重庆市", "春城": "昆明市", "泉城": "济南市",
+    "冰城": "哈尔滨市", "江城": "武汉市", "星城": "长沙市", "榕城": "福州市", "鹭岛": "厦门市", "金陵": "南京市",
+    "杭城": "杭州市", "津门": "天津市", "古都": "西安市", "长安": "西安市",
+}
+
+
+def level_of(adcode: int) -> int:
+    if adcode % 10000 == 0:
+        return LEVEL_PROVINCE
+    if adcode % 100 == 0:
+        return LEVEL_CITY
+    return LEVEL_DISTRICT
+
+
+def normalize(name: str) -> str:
+    return "".join(name.split()).lower()
+
+
+def short_name(name: str) -> str | None:
+    for suffix in NAME_SUFFIXES:
+        if name.endswith(suffix) and len(name) - len(suffix) >= 2:
+            return name[:-len(suffix)]
+    return None
+
+
+def name_keys(name: str) -> set[str]:
+    """一个地区收录的所有查找键: 全称、简称，以及两者的拼音"""
+    name = normalize(name)
+    keys = {name}
+    short = short_name(name)
+    if short:
+        keys.add(short)
+    if lazy_pinyin is not None:
+        keys.update("".join(lazy_pinyin(key)) for key in list(keys))
+    return keys
+
+
+class AdcodeIndex:
+    """只读的 mmap 索引加上可追加的写回文件；索引文件不存在时只使用写回文件"""
+
+    def __init__(self, path: str | None = INDEX_FILE, overlay_path: str = OVERLAY_FILE):
+        self.path = path
+        self.overlay_path = overlay_path
+        self.data = None
+        self.size = 0
+        self.names_offset = 0
+        if path is not None and os.path.exists(path):
+            with open(path, "rb") as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self.size, self.names_offset = INDEX_HEADER.unpack_from(self.data, 0)
+            if magic != INDEX_MAGIC or self.names_offset != INDEX_HEADER.size + self.size * INDEX_RECORD.size:
+                self.data.close()
+                raise ValueError(f"adcode 索引文件格式不正确: {path}")
+        self.overlay: dict[str, str] = {}
+        if os.path.exists(overlay_path):
+            with open(overlay_path, encoding="utf-8") as f:
+                for line in f:
+                    name, _, adcode = line.rstrip("\n").partition("\t")
+                    if name and adcode:
+                        self.overlay[name] = adcode
+
+    def __len__(self) -> int:
+        return self.size + len(self.overlay)
+
+    def close(self) -> None:
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+
+    def _record(self, i: int) -> tuple[bytes, int, int]:
+        offset, length, level, adcode = INDEX_RECORD.unpack_from(self.data, INDEX_HEADER.size + i * INDEX_RECORD.size)
+        start = self.names_offset + offset
+        return self.data[start:start + length], level, adcode
+
+    def _lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, name: str) -> str | None:
+        """按名称精确查找(全称、简称、拼音或别称)，同名时返回级别最高的；找不到返回 None"""
+        key = normalize(name)
+        if key in self.overlay:
+            return self.overlay[key]
+        if self.data is None:
+            return None
+        raw = key.encode("utf-8")
+        i = self._lower_bound(raw)
+        if i < self.size:
+            found, _, adcode = self._record(i)
+            if found == raw:
+                return str(adcode)
+        return None
+
+    def search(self, prefix: str, limit: int = 10) -> list[tuple[str, str]]:
+        """前缀查找，返回最多 limit 个 (名称, adcode)，同一 adcode 只返回一次"""
+        key = normalize(prefix)
+        results = {}
+        for name, adcode in self.overlay.items():
+            if name.startswith(key):
+                results.setdefault(adcode, name)
+        if self.data is not None and key:
+            raw = key.encode("utf-8")
+            i = self._lower_bound(raw)
+            while i < self.size and len(results) < limit:
+                found, _, adcode = self._record(i)
+                if not found.startswith(raw):
+                    break
+                results.setdefault(str(adcode), found.decode("utf-8"))
+                i += 1
+        return [(name, adcode) for adcode, name in list(results.items())[:limit]]
+
+    def resolve(self, name: str) -> str | None:
+        """先精确查找；没有时若该前缀只对应一个地区也可以确定"""
+        adcode = self.lookup(name)
+        if adcode is not None:
+            return adcode
+        matches = self.search(name, limit=2)
+        return matches[0][1] if len(matches) == 1 else None
+
+    def remember(self, name: str, adcode: str) -> None:
+        """把接口查到的结果写回，追加一行即可，不需要重建索引；写入失败时只保留在内存中"""
+        key = normalize(name)
+        adcode = str(adcode)
+        if not key or self.overlay.get(key) == adcode:
+            return
+        self.overlay[key] = adcode
+        try:
+            with open(self.overlay_path, "a", encoding="utf-8") as f:
+                f.write(f"{key}\t{adcode}\n")
+        except OSError:
+            pass
+
+
+def load_index(path: str = INDEX_FILE, overlay_path: str = OVERLAY_FILE) -> AdcodeIndex:
+    # 索引文件损坏时退回只用写回文件，解析名称仍然可以走接口
+    try:
+        return AdcodeIndex(path, overlay_path)
+    except (OSError, ValueError):
+        return AdcodeIndex(None, overlay_path)
+
+
+def build_index(path: str, districts: Iterable[tuple[str, int]]) -> int:
+    """districts 为 (正式名称, adcode)；生成各种查找键后排序写入，先写临时文件再替换，返回记录数"""
+    records = {}
+    official = {}
+    for name, adcode in districts:
+        adcode = int(adcode)
+        level = level_of(adcode)
+        official.setdefault(normalize(name), (level, adcode))
+        for key in name_keys(name):
+            # 同一个键只保留级别最高的地区
+            if key not in records or (level, adcode) < records[key]:
+                records[key] = (level, adcode)
+    for alias, name in ALIASES.items():
+        if name in official:
+            for key in name_keys(alias):
+                records.setdefault(key, official[name])
+
+    names = bytearray()
+    rows = []
+    for key in sorted(records, key=lambda k: k.encode("utf-8")):
+        raw = key.encode("utf-8")
+        level, adcode = records[key]
+        rows.append(INDEX_RECORD.pack(len(names), len(raw), level, adcode))
+        names += raw
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, len(rows), INDEX_HEADER.size + len(rows) * INDEX_RECORD.size))
+        f.write(b"".join(rows))
+        f.write(names)
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+def read_csv(path: str) -> Iterable[tuple[str, int]]:
+    # 高德的编码表: 中文名,adcode,citycode；表头和 adcode 不是数字的行跳过
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and row[1].strip().isdigit():
+                yield row[0].strip(), int(row[1])
+
+
+def fetch_districts(api_key: str) -> Iterable[tuple[str, int]]:
+    """从高德行政区划接口拉取全国省、市、区县三级"""
+    import httpx
+    response = httpx.get("https://restapi.amap.com/v3/config/district",
+                         params={"keywords": "中国", "subdistrict": 3, "key": api_key}, timeout=60)
+    response.raise_for_status()
+    data = response.json()
+    if data.get("status") != "1":
+        raise RuntimeError(f"行政区划接口返回错误: {data.get('info')}")
+    stack = list(data["districts"][0]["districts"])
+    while stack:
+        district = stack.pop()
+        if district.get("adcode", "").isdigit():
+            yield district["name"], int(district["adcode"])
+        stack.extend(district.get("districts", []))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线 adcode 索引")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="生成索引文件")
+    source = build.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="高德 adcode 编码表(CSV)")
+    source.add_argument("--api", action="store_true", help="用环境变量 LBS_AMAP_API_KEY 从接口拉取")
+    build.add_argument("--output", default=INDEX_FILE)
+    find = subparsers.add_parser("lookup", help="查询名称或前缀")
+    find.add_argument("names", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if args.api:
+            api_key = os.getenv("LBS_AMAP_API_KEY")
+            if not api_key:
+                sys.exit("未设置 LBS_AMAP_API_KEY")
+            districts = fetch_districts(api_key)
+        else:
+            districts = read_csv(args.csv)
+        count = build_index(args.output, districts)
+        note = "" if lazy_pinyin is not None else "(未安装 pypinyin，没有收录拼音)"
+        print(f"写入 {count} 个查找键到 {args.output}{note}")
+    else:
+        index = load_index()
+        for name in args.names:
+            print(name, index.resolve(name), index.search(name, limit=5))
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ from typing import Any, Optional, Dict, Union
 import requests
 from requests.exceptions import RequestException
 
+from adcode_index import load_index
+
 print(os.environ)
 
 AMAP_API_KEY = os.getenv("LBS_AMAP_API_KEY")
@@ -17,13 +19,22 @@ REST_API_AMAP_BASE  = "https://restapi.amap.com"
 # 设置请求头的User-Agent,公共 api 要求提供此信息以识别客户端
 USER_AGENT = "weather-app/1.0"
 
-def get_cn_adcode(keywords:str)->Any:
+# 离线 adcode 索引，与 weather.py 共用同一个索引文件和写回文件
+adcode_index = load_index()
 
+def get_cn_adcode(keywords:str)->Any:
+    # 先查离线索引，查不到再请求接口并把结果写回
+    adcode = adcode_index.resolve(keywords)
+    if adcode is not None:
+        return adcode
     url = f"{REST_API_AMAP_BASE}/v3/config/district?keywords={keywords}&subdistrict=0&key={AMAP_API_KEY}"
     ad_code_data = make_request(url)
-    if not ad_code_data or "districts" not in ad_code_data:
+    if not ad_code_data or not ad_code_data.get("districts"):
         return f"未查询到:{keywords} 对应的 adcode值 "
-    return ad_code_data["districts"][0]["adcode"]
+    district = ad_code_data["districts"][0]
+    adcode_index.remember(keywords, district["adcode"])
+    adcode_index.remember(district["name"], district["adcode"])
+    return district["adcode"]
 # 辅助函数
 # (异步函数)  返回 dict[str,所有类型] 或者空
 
@@ -0,0 +1,110 @@
+"""
+进程内的响应缓存: 按过期时间(TTL)失效，总大小超过上限时淘汰最久未使用的条目(LRU)
+TTL 优先取上游响应头中的 Cache-Control / Expires，没有时按接口使用默认值
+"""
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Mapping
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+def ttl_from_headers(headers: Mapping[str, str], default: float) -> float:
+    """
+    根据响应头计算可以缓存的秒数
+    no-store / no-cache / private 不缓存；s-maxage、max-age 优先于 Expires；都没有时返回 default
+    """
+    cache_control = headers.get("cache-control", "")
+    max_age = None
+    for directive in cache_control.split(","):
+        name, _, value = directive.strip().partition("=")
+        name = name.lower()
+        if name in ("no-store", "no-cache", "private"):
+            return 0.0
+        if name in ("max-age", "s-maxage") and value.strip('"').isdigit():
+            # s-maxage 针对共享缓存，本缓存被多个客户端共用，优先使用
+            if name == "s-maxage" or max_age is None:
+                max_age = float(value.strip('"'))
+    if max_age is not None:
+        # Age 为响应在上游缓存中已经停留的时间
+        age = headers.get("age", "")
+        return max(max_age - (float(age) if age.isdigit() else 0.0), 0.0)
+
+    expires = headers.get("expires")
+    if expires:
+        try:
+            expires_at = parsedate_to_datetime(expires)
+            date = headers.get("date")
+            now = parsedate_to_datetime(date) if date else None
+        except (TypeError, ValueError):
+            return 0.0  # 无法解析的 Expires 按规范视为已过期
+        if expires_at.tzinfo is None or (now is not None and now.tzinfo is None):
+            return 0.0
+        now_ts = now.timestamp() if now is not None else time.time()
+        return max(expires_at.timestamp() - now_ts, 0.0)
+    return default
+
+
+def normalize_url(url: str) -> str:
+    """缓存键: 主机名小写、查询参数排序，同一请求参数顺序不同也能命中"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ""))
+
+
+class TTLCache:
+    """
+    定长内存的 TTL + LRU 缓存，值按调用方给出的大小(字节)计入上限
+    只在事件循环线程中使用，不需要加锁；缓存的值会被多个调用方共享，不能修改
+    """
+
+    def __init__(self, max_bytes: int, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.entries: OrderedDict[str, tuple[float, Any, int]] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> Any | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value, size = entry
+        if expires_at <= self.clock():
+            del self.entries[key]
+            self.size -= size
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: float, size: int = 1) -> None:
+        """ttl 不大于 0 或单个条目超过上限时不缓存"""
+        self.pop(key)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        self.entries[key] = (self.clock() + ttl, value, size)
+        self.size += size
+        # 先淘汰已过期的，仍超出上限时再按最久未使用淘汰
+        if self.size > self.max_bytes:
+            now = self.clock()
+            for stale in [k for k, (expires_at, _, _) in self.entries.items() if expires_at <= now]:
+                self.pop(stale)
+        while self.size > self.max_bytes:
+            _, (_, _, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted
+
+    def pop(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.size = 0
@@ -0,0 +1,36 @@
+"""
+请求合并(single-flight): 同一时刻对同一资源的多个请求只向上游发一次，所有调用方等待同一个结果
+只合并正在进行的请求，完成后(无论成功或失败)立即移除，失败不会被缓存，下一次调用会重新请求
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls: dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0  # 被合并掉的调用次数
+
+    def __len__(self) -> int:
+        return len(self.calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        key 相同且已有请求在进行时等待它的结果，否则调用 fn() 发起请求
+        请求在独立的任务中运行，发起它的调用方被取消不会影响其他等待者；异常会抛给每一个等待者
+        """
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        # 所有等待者都已取消时没有人取回异常，这里取一次，避免 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
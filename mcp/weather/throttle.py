@@ -0,0 +1,50 @@
+"""
+上游限流: 每个上游一个并发信号量加一个令牌桶，批量查询并发请求时也不会超过接口的并发和 QPS 配额
+只在事件循环中使用，不需要加锁
+"""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """每秒补充 rate 个令牌，最多积攒 burst 个；acquire() 在没有令牌时等待"""
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class UpstreamLimiter:
+    """
+    async with limiter: 先占一个并发名额，再取一个令牌，请求结束后归还名额
+    rate 为 None 时只限制并发
+    """
+
+    def __init__(self, concurrency: int, rate: float | None = None, burst: float | None = None):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst) if rate else None
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        if self.bucket is not None:
+            try:
+                await self.bucket.acquire()
+            except BaseException:
+                self.semaphore.release()
+                raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.semaphore.release()
@@ -1,3 +1,6 @@
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
 from typing import Any,Annotated
 import httpx
 from mcp.server.fastmcp import FastMCP
@@ -5,9 +8,10 @@ import os
 
 from pydantic import Field
 
-# 1.初始化 mcp 服务器
-# 创建一个名为"weather" 的服务器实例，名字用于大模型识别工具
-mcp =FastMCP("weather-search")
+from adcode_index import load_index
+from response_cache import TTLCache, normalize_url, ttl_from_headers
+from singleflight import SingleFlight
+from throttle import UpstreamLimiter
 
 AMAP_API_KEY = os.getenv("LBS_AMAP_API_KEY")
 #常量定义
@@ -18,32 +22,178 @@ REST_API_AMAP_BASE  = "https://restapi.amap.com"
 # 设置请求头的User-Agent,公共 api 要求提供此信息以识别客户端
 USER_AGENT = "weather-app/1.0"
 
+# HTTP 连接池配置，均可用环境变量覆盖
+# 总超时和建立连接的超时(秒)
+HTTP_TIMEOUT = float(os.getenv("WEATHER_HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("WEATHER_HTTP_CONNECT_TIMEOUT", "5"))
+# 每个上游主机最多同时打开的连接数，以及空闲时保留的长连接数和保留时间(秒)
+HTTP_MAX_CONNECTIONS = int(os.getenv("WEATHER_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("WEATHER_HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("WEATHER_HTTP_KEEPALIVE_EXPIRY", "60"))
+# 是否启用 HTTP/2，需要额外安装 h2(pip install "httpx[http2]")，未安装时自动退回 HTTP/1.1
+HTTP2 = os.getenv("WEATHER_HTTP2", "0").lower() in ("1", "true", "yes")
+
+# 响应缓存的内存上限(MB)
+CACHE_MAX_BYTES = int(os.getenv("WEATHER_CACHE_MB", "64")) * 1024 * 1024
+# 上游响应没有 Cache-Control / Expires 时各接口的默认缓存时间(秒)，按 URL 路径前缀匹配，没有匹配的不缓存
+DEFAULT_TTLS = {
+    "/points/": 7 * 24 * 3600,  # 网格信息基本不会变化
+    "/gridpoints/": 30 * 60,  # NWS 预报大约每小时更新
+    "/alerts/": 60,
+    "/v3/weather/": 10 * 60,
+    "/v3/config/district": 24 * 3600,
+}
+# 经纬度 -> 预报 URL 的缓存时间和最多保存的地点数
+POINTS_TTL = 30 * 24 * 3600
+POINTS_CACHE_SIZE = 10000
+
+# 所有工具共用的响应缓存(缓存解析后的 JSON，按响应体字节数计入上限)和经纬度 -> 预报 URL 缓存
+response_cache = TTLCache(CACHE_MAX_BYTES)
+forecast_urls = TTLCache(POINTS_CACHE_SIZE)
+# 正在进行的上游请求，用于合并同时发出的相同请求
+inflight = SingleFlight()
+
+# 批量工具一次最多查询的地点数
+MAX_BATCH = 100
+# 每个上游的并发请求数上限、每秒请求数上限和令牌桶容量(突发)，按接口配额调整；缓存命中不占配额
+# 并发默认与连接池一致，再多也只是在连接池中排队
+# 突发默认能容纳一整批的请求(NWS 每个地点 /points 加预报两次，高德一次)，一批查询不被限速，
+# 持续的请求量仍受每秒请求数约束；账号配额较低时调小突发，否则一批请求会同时打到上游被拒绝
+NWS_CONCURRENCY = int(os.getenv("WEATHER_NWS_CONCURRENCY", str(HTTP_MAX_CONNECTIONS)))
+NWS_RATE = float(os.getenv("WEATHER_NWS_RATE", "10"))
+NWS_BURST = float(os.getenv("WEATHER_NWS_BURST", str(2 * MAX_BATCH)))
+AMAP_CONCURRENCY = int(os.getenv("WEATHER_AMAP_CONCURRENCY", str(HTTP_MAX_CONNECTIONS)))
+AMAP_RATE = float(os.getenv("WEATHER_AMAP_RATE", "10"))
+AMAP_BURST = float(os.getenv("WEATHER_AMAP_BURST", str(MAX_BATCH)))
+
+upstream_limiters = {
+    httpx.URL(NWS_API_BASE).host: UpstreamLimiter(NWS_CONCURRENCY, NWS_RATE, NWS_BURST),
+    httpx.URL(REST_API_AMAP_BASE).host: UpstreamLimiter(AMAP_CONCURRENCY, AMAP_RATE, AMAP_BURST),
+}
+
+# 离线 adcode 索引，城市名解析成 adcode 时先查本地，查不到再请求接口并写回
+adcode_index = load_index()
+
+# 每个上游主机一个长期存在的客户端(连接池)，第一次请求该主机时创建，服务器关闭时统一关闭
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    if not HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """
+    返回 url 所在主机的共享客户端，复用已建立的 TCP/TLS 连接，省去每次请求的 DNS 查询和握手
+    连接数上限按主机分别计算，一个上游变慢不会占满另一个上游的连接
+    """
+    host = httpx.URL(url).host
+    client = _clients.get(host)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=_http2_available(),
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+        )
+        _clients[host] = client
+    return client
+
+
+async def close_clients() -> None:
+    """关闭所有连接池，服务器退出时调用"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+# HTTP 模式下为 True: 每个会话(无状态模式下每个请求)都会进入一次 MCP 的 lifespan，
+# 连接池由 create_app 在整个应用退出时关闭，不能在会话结束时关闭
+_app_owns_clients = False
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """服务器启动时为两个上游建好客户端，stdio 模式下会话结束(进程退出)时关闭连接"""
+    get_client(NWS_API_BASE)
+    get_client(REST_API_AMAP_BASE)
+    try:
+        yield
+    finally:
+        if not _app_owns_clients:
+            await close_clients()
+
+
+# 1.初始化 mcp 服务器
+# 创建一个名为"weather" 的服务器实例，名字用于大模型识别工具
+mcp =FastMCP("weather-search", lifespan=lifespan)
+
 # 辅助函数
+def default_ttl(url: str) -> float:
+    path = httpx.URL(url).path
+    for prefix, ttl in DEFAULT_TTLS.items():
+        if path.startswith(prefix):
+            return ttl
+    return 0
+
+
+async def fetch_json(url: str, headers: dict[str, str], key: str) -> Any:
+    """
+    向上游发一次请求并缓存成功的结果，失败时抛出异常
+    由 make_request 通过请求合并调用，同一时刻相同的请求只会执行一次
+    """
+    # 使用该主机的共享客户端执行异步 HTTP GET 请求，超时按客户端的配置
+    client = get_client(url)
+    limiter = upstream_limiters.get(httpx.URL(url).host)
+    if limiter is None:
+        response = await client.get(url,headers =headers)
+    else:
+        # 按上游的并发和速率配额排队
+        async with limiter:
+            response = await client.get(url,headers =headers)
+    # 如果响应状态码是 4xx 或 5xx（表示客户端或服务器错误），则会引发一个异常
+    response.raise_for_status()
+    data = response.json()
+    # 高德接口出错时 HTTP 状态码仍是 200，status 为 "0"，这种结果不缓存
+    if not (isinstance(data, dict) and data.get("status") == "0"):
+        response_cache.set(key, data, ttl_from_headers(response.headers, default_ttl(url)), len(response.content))
+    return data
+
+
 # (异步函数)  返回 dict[str,所有类型] 或者空
 async def make_request(url:str) ->dict[str,Any] | None:
     """
     通用异步函数、用户请求 API 并处理常见错误
+    成功的响应按上游缓存头(或接口的默认时间)缓存，过期前相同的请求直接返回缓存；
+    缓存未命中时，多个调用方同时发出的相同请求合并成一次上游请求，失败时每个调用方都返回 None
     :param
         url: 要请求的完整 URL。
     :return:
         dict[str, Any] | None: 成功时返回解析后的 JSON 字典，失败时返回 None。
     """
+    key = normalize_url(url)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+
     headers = {
         "User-Agent": USER_AGENT,
         "Accept" : "application/geo+json"  # NWS API 推荐的 Accept 头
     }
-    # 使用 httpx.AsyncClient 执行异步 HTTP GET 请求
-    async  with httpx.AsyncClient() as client:
-        try:
-            # 发起请求 设置 30s 超时
-            response = await client.get(url,headers =headers,timeout=30)
-            # 如果响应状态码是 4xx 或 5xx（表示客户端或服务器错误），则会引发一个异常
-            response.raise_for_status()
-            # 请求成功了 返回json格式响应体
-            return response.json()
-        except Exception:
-            # 捕获所有可能的异常（如网络问题、超时、HTTP错误等），并返回 None
-            return None
+    try:
+        # 合并键包含影响响应内容的请求头
+        return await inflight.do((key, headers["Accept"]), lambda: fetch_json(url, headers, key))
+    except Exception:
+        # 捕获所有可能的异常（如网络问题、超时、HTTP错误等），并返回 None
+        return None
 
 
 
@@ -119,13 +269,18 @@ async def get_forecast(latitude:Annotated[float,Field(description="地点的纬
     """
     #NWS API 获取预报需要两部
     # 第一步：根据经纬度获取一个包含具体预报接口 URL 的网格点信息
-    points_url = f"{NWS_API_BASE}/points/{latitude},{longitude}"
-    points_data =  await make_request(points_url)
-    if not points_data:
-        return "无法获取该地点的预报数据。"
+    # NWS 只接受 4 位小数的坐标(更多位会被重定向)，同时作为缓存键，附近的请求可以共用
+    location = f"{round(latitude, 4)},{round(longitude, 4)}"
+    forecast_url = forecast_urls.get(location)
+    if forecast_url is None:
+        points_url = f"{NWS_API_BASE}/points/{location}"
+        points_data =  await make_request(points_url)
+        if not points_data:
+            return "无法获取该地点的预报数据。"
 
-    # 第二步:从上一步响应中提取实际的天气预报接口 URL
-    forecast_url = points_data["properties"]["forecast"]
+        # 第二步:从上一步响应中提取实际的天气预报接口 URL，地点对应的网格基本不变，长期缓存
+        forecast_url = points_data["properties"]["forecast"]
+        forecast_urls.set(location, forecast_url, POINTS_TTL)
     # 第三步:请求详细的天气预报数据
     forecast_data = await make_request(forecast_url)
     if not forecast_data:
@@ -155,23 +310,144 @@ async def get_cn_weather(adcode:Annotated[int,Field(description="根据输入的
     """
     amap_url =f"{REST_API_AMAP_BASE}/v3/weather/weatherInfo?city={adcode}&key={AMAP_API_KEY}&extensions=all"
     points_data = await make_request(amap_url)
-    if points_data['info']=='OK':
+    if points_data and points_data.get('info')=='OK':
         return get_format_cn_weather(points_data)
     return "无法获取最新天气数据"
 
 @mcp.tool()
 async def get_cn_adcode(keywords:Annotated[str,Field(description="获取输入城市的 adcode 值 ")])->Any:
+    # 先查离线索引(全称、简称、拼音、别称)，命中时不需要请求网络
+    adcode = adcode_index.resolve(keywords)
+    if adcode is not None:
+        return adcode
     url = f"{REST_API_AMAP_BASE}/v3/config/district?keywords={keywords}&subdistrict=0&key={AMAP_API_KEY}"
     ad_code_data = await make_request(url)
-    if not ad_code_data or "districts" not in ad_code_data:
+    if not ad_code_data or not ad_code_data.get("districts"):
         return f"未查询到:{keywords} 对应的 adcode值 "
-    return ad_code_data["districts"][0]["adcode"]
+    district = ad_code_data["districts"][0]
+    # 接口查到的结果写回索引，查询词和正式名称下次都能直接命中
+    adcode_index.remember(keywords, district["adcode"])
+    adcode_index.remember(district["name"], district["adcode"])
+    return district["adcode"]
+
+
+# 批量查询: 各地点并发请求(受上游限流约束)，结果按输入顺序返回，单个地点失败不影响其他地点
+# 各批量工具先检查数量上限再创建协程
+async def gather_in_order(labels: list[str], tasks: list) -> str:
+    if not labels:
+        return "没有需要查询的地点"
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    sections = []
+    for label, result in zip(labels, results):
+        if isinstance(result, Exception):
+            result = f"查询失败: {result!r}"
+        sections.append(f"【{label}】\n{result}")
+    return "\n=====\n".join(sections)
+
+
+@mcp.tool()
+async def get_alert_batch(states:Annotated[list[str],Field(description="美国州代码列表(例如:[\"CA\",\"NY\"])")]) -> str:
+    """
+    批量获取多个美国州当前生效的预警信息，并发查询，结果按输入顺序返回
+    """
+    if len(states) > MAX_BATCH:
+        return f"一次最多查询 {MAX_BATCH} 个地点"
+    return await gather_in_order(states, [get_alert(state) for state in states])
+
+
+@mcp.tool()
+async def get_forecast_batch(locations:Annotated[list[tuple[float,float]],Field(description="地点列表，每项为 [纬度, 经度]")],
+                             days:Annotated[int,Field(description="查询最近几个预报周期的天气,默认值为 5",default=5)])->str:
+    """
+    批量根据经纬度获取天气预报，并发查询，结果按输入顺序返回
+    """
+    if len(locations) > MAX_BATCH:
+        return f"一次最多查询 {MAX_BATCH} 个地点"
+    return await gather_in_order([f"{lat},{lon}" for lat, lon in locations],
+                                 [get_forecast(lat, lon, days) for lat, lon in locations])
+
+
+@mcp.tool()
+async def get_cn_weather_batch(adcodes:Annotated[list[int],Field(description="中国城市的 adcode 编码列表")])->str:
+    """
+    批量根据 adcode 查询中国城市天气，并发查询，结果按输入顺序返回
+    """
+    if len(adcodes) > MAX_BATCH:
+        return f"一次最多查询 {MAX_BATCH} 个地点"
+    return await gather_in_order([str(adcode) for adcode in adcodes], [get_cn_weather(adcode) for adcode in adcodes])
 
 
 # ---启动服务器---
+TRANSPORTS = ("stdio", "sse", "streamable-http")
+# 收到退出信号后等待进行中的请求完成的最长时间(秒)
+GRACEFUL_SHUTDOWN_TIMEOUT = 10
+
+
+def create_app():
+    """
+    HTTP 模式的 ASGI 应用工厂，uvicorn 多进程时每个工作进程各调用一次
+    传输方式和是否无状态从环境变量读取(由 main 设置，工作进程继承)；应用退出时关闭连接池
+    """
+    global _app_owns_clients
+    _app_owns_clients = True
+    if os.getenv("WEATHER_TRANSPORT") == "sse":
+        app = mcp.sse_app()
+    else:
+        mcp.settings.stateless_http = os.getenv("WEATHER_STATELESS", "0").lower() in ("1", "true", "yes")
+        app = mcp.streamable_http_app()
+
+    inner_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def app_lifespan(app):
+        async with inner_lifespan(app):
+            try:
+                yield
+            finally:
+                await close_clients()
+
+    app.router.lifespan_context = app_lifespan
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="天气查询 MCP 服务器")
+    parser.add_argument("--transport", choices=TRANSPORTS, default=os.getenv("WEATHER_TRANSPORT", "stdio"),
+                        help="stdio 由客户端启动子进程通信；sse / streamable-http 作为长期运行的 HTTP 服务，多个客户端共用缓存和连接池")
+    parser.add_argument("--host", default=os.getenv("WEATHER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("WEATHER_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEATHER_WORKERS", "1")),
+                        help="HTTP 模式下监听同一端口的工作进程数，大于 1 时只支持无状态的 streamable-http")
+    parser.add_argument("--stateless", action="store_true",
+                        default=os.getenv("WEATHER_STATELESS", "0").lower() in ("1", "true", "yes"),
+                        help="streamable-http 不保存会话，每个请求独立处理")
+    args = parser.parse_args()
+
+    if args.transport == "stdio":
+        # transport = 'stdio' 表示服务器将通过标准输入/输出(stdin/stdout) 与客户端(deepseek大模型) 进行通信
+        mcp.run(transport='stdio')
+        return
+
+    if args.workers > 1:
+        if args.transport == "sse":
+            parser.error("sse 的会话保存在进程内，不能使用多个工作进程")
+        # 会话只存在于创建它的进程中，多个进程共用一个端口时请求可能落到其他进程，只能无状态
+        args.stateless = True
+    os.environ["WEATHER_TRANSPORT"] = args.transport
+    os.environ["WEATHER_STATELESS"] = "1" if args.stateless else "0"
+
+    import uvicorn
+    # uvicorn 收到 SIGINT/SIGTERM 后停止接受新连接，等进行中的请求完成(最多 GRACEFUL_SHUTDOWN_TIMEOUT 秒)再退出
+    if args.workers > 1:
+        uvicorn.run("weather:create_app", factory=True, app_dir=os.path.dirname(os.path.abspath(__file__)),
+                    host=args.host, port=args.port, workers=args.workers,
+                    timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT)
+    else:
+        uvicorn.run(create_app(), host=args.host, port=args.port, timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT)
+
+
 # 这是一个标准的 python 入口点检查
 # 确保只有当这个文件被直接运行时，以下代码才会被执行
 if __name__ == '__main__':
-    # 初始化并运行 mcp 服务器
-    # transport = 'stdio' 表示服务器将通过标准输入/输出(stdin/stdout) 与客户端(deepseek大模型) 进行通信
-    mcp.run(transport='stdio')
\ No newline at end of file
+    # 初始化并运行 mcp 服务器，默认 stdio，也可以用 --transport 或环境变量 WEATHER_TRANSPORT 选择 HTTP 传输
+    main()
\ No newline at end of file